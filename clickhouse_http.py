@@ -0,0 +1,75 @@
+"""Minimal ClickHouse HTTP (port 8123) client shared by the demo tools."""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from typing import Iterator
+
+import requests
+
+
+class ClickHouseError(RuntimeError):
+    """Raised when ClickHouse rejects a query (non-2xx response)."""
+
+
+class ClickHouseHTTP:
+    """Thin wrapper around the ClickHouse HTTP interface.
+
+    Defaults come from CLICKHOUSE_URL / CLICKHOUSE_USER / CLICKHOUSE_PASSWORD,
+    falling back to the `api` user that ClickStack local mode exposes.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        user: str | None = None,
+        password: str | None = None,
+        timeout: float = 30.0,
+    ):
+        self.url = (url or os.getenv("CLICKHOUSE_URL", "http://localhost:8123")).rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.params = {
+            "user": user or os.getenv("CLICKHOUSE_USER", "api"),
+            "password": password or os.getenv("CLICKHOUSE_PASSWORD", "api"),
+        }
+
+    def _post(self, sql: str, stream: bool = False, **params) -> requests.Response:
+        r = self.session.post(
+            f"{self.url}/", data=sql.encode("utf-8"), params=params,
+            timeout=self.timeout, stream=stream,
+        )
+        if r.status_code >= 400:
+            raise ClickHouseError(f"HTTP {r.status_code}: {r.text.strip()[:500]}")
+        return r
+
+    def execute(self, sql: str, **params) -> str:
+        """Run a statement and return the raw response body."""
+        return self._post(sql, **params).text
+
+    def query(self, sql: str, **params) -> list[dict]:
+        """Run a SELECT and return rows as dicts (FORMAT JSONEachRow)."""
+        body = self._post(f"{sql}\nFORMAT JSONEachRow", **params).text
+        return [json.loads(line) for line in body.splitlines() if line]
+
+    def stream(self, sql: str, **params) -> Iterator[dict]:
+        """Run a SELECT and yield rows one at a time without buffering the result."""
+        with self._post(f"{sql}\nFORMAT JSONEachRow", stream=True, **params) as r:
+            for line in r.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+def quote(value: str) -> str:
+    """Quote a string literal for ClickHouse SQL."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list (p in 0-100)."""
+    if not sorted_values:
+        return float("nan")
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
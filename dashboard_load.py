@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Simulate concurrent dashboard viewers against ClickHouse.
+
+Loads the dashboards from deploy_checkout_dashboard.py,
+deploy_nginx_dashboard.py and create_metrics_dashboard.py (or any file
+schema_snapshot.py can load), translates every tile series into the chart
+query it stands for (Lucene `where` -> SQL, aggFn, groupBy, time buckets)
+and runs N virtual viewers. Each viewer refreshes all tiles every
+--refresh seconds with up to --tile-concurrency queries in flight, like a
+browser tab. For each step in --viewers, it reports per-tile latency
+percentiles, query throughput and errors.
+
+Point --url at query_proxy.py to measure the cache, and use --with-stream
+to run stream_data.py in the background during the test.
+
+Usage:
+    python dashboard_load.py --viewers 1,5,10,25,50 --duration 60
+    python dashboard_load.py --range 24h --refresh 30 --viewers 10 deploy_nginx_dashboard.py
+    python dashboard_load.py --viewers 20 --with-stream "--cycle 60 --rate 4"
+    python dashboard_load.py --url http://localhost:8124 --viewers 50     # Through query_proxy.py
+    python dashboard_load.py --print-sql                                  # Show the generated SQL
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+
+import lucene
+from clickhouse_http import ClickHouseError, ClickHouseHTTP, percentile, quote
+from schema_snapshot import DEFAULT_DASHBOARDS, load_dashboards
+
+load_dotenv()
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# sourceId -> (table, timestamp, default search field, sort-key time column)
+SOURCES = {
+    "trace": ("otel_traces", "Timestamp", "SpanName", "Timestamp"),
+    "log": ("otel_logs", "Timestamp", "Body", "TimestampTime"),
+}
+# HyperDX-style bucket sizes; the smallest giving <= MAX_BUCKETS points wins
+GRANULARITIES_S = (1, 5, 15, 30, 60, 300, 900, 1800, 3600, 7200, 21600, 43200, 86400)
+MAX_BUCKETS = 120
+TABLE_LIMIT = 100
+SEARCH_LIMIT = 200
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass
+class TileQuery:
+    dashboard: str
+    tile: str
+    sql: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.dashboard} / {self.tile}"
+
+
+def parse_duration(text: str) -> float:
+    unit = text[-1]
+    if unit in DURATION_UNITS:
+        return float(text[:-1]) * DURATION_UNITS[unit]
+    return float(text)
+
+
+def granularity(range_s: float) -> int:
+    for g in GRANULARITIES_S:
+        if range_s / g <= MAX_BUCKETS:
+            return g
+    return GRANULARITIES_S[-1]
+
+
+def _agg_sql(series: dict, value_expr: str, ts_col: str) -> str:
+    agg = series.get("aggFn") or "count"
+    field = series.get("field") or ""
+    numeric = f"toFloat64OrNull(toString({value_expr}))" if "[" in value_expr else value_expr
+    if agg == "count":
+        return "count()"
+    if agg == "count_distinct":
+        return f"uniq({value_expr})"
+    if agg == "quantile":
+        return f"quantile({float(series.get('level', 0.5))})({numeric})"
+    if agg == "last_value":
+        return f"argMax({numeric}, {ts_col})"
+    if agg in ("avg", "sum", "min", "max", "any"):
+        return f"{agg}({numeric})"
+    return value_expr if field else "count()"
+
+
+def series_sql(series: dict, range_s: float, end_s: float | None = None) -> str | None:
+    """Equivalent ClickHouse query for one tile series; None for markdown."""
+    stype = series.get("type")
+    if stype == "markdown":
+        return None
+    kind = series.get("sourceId")
+    if kind == "metric" or series.get("metricName"):
+        data_type = (series.get("metricDataType") or "gauge").replace(" ", "_")
+        table, ts_col, text_col = f"otel_metrics_{data_type}", "TimeUnix", "MetricName"
+        key_col = ts_col
+    elif kind in SOURCES:
+        table, ts_col, text_col, key_col = SOURCES[kind]
+    else:
+        raise ValueError(f"unknown sourceId {kind!r}")
+
+    end = f"toDateTime64({end_s:.3f}, 3)" if end_s else "now64(3)"
+    start = f"{end} - INTERVAL {int(range_s)} SECOND"
+    conditions = [f"{ts_col} >= {start}", f"{ts_col} < {end}"]
+    if key_col != ts_col:
+        # otel_logs is partitioned and sorted by the second-granularity
+        # TimestampTime, so only a bound on it prunes parts and granules
+        conditions[:0] = [f"{key_col} >= toDateTime({start})", f"{key_col} <= toDateTime({end})"]
+    order = f"{key_col} DESC, {ts_col} DESC" if key_col != ts_col else f"{ts_col} DESC"
+    if series.get("metricName"):
+        conditions.append(f"MetricName = {quote(series['metricName'])}")
+    if series.get("where"):
+        conditions.append(lucene.to_sql(lucene.parse(series["where"]), default_field=text_col))
+    where = " AND ".join(conditions)
+
+    if stype == "search":
+        return (
+            f"SELECT {ts_col} AS ts, ServiceName, {text_col} FROM {table} WHERE {where} "
+            f"ORDER BY {order} LIMIT {SEARCH_LIMIT}"
+        )
+
+    field = series.get("field") or ""
+    if table.startswith("otel_metrics_histogram"):
+        # Bucketed histograms: the chart reads Count/Sum per point
+        value_expr = "Sum / nullIf(Count, 0)" if field else "Count"
+    else:
+        value_expr = lucene.field_sql(field) if field else ts_col
+    agg = _agg_sql(series, value_expr, ts_col)
+    groups = [lucene.field_sql(g) for g in series.get("groupBy") or []]
+    group_cols = "".join(f", {g} AS `group_{i}`" for i, g in enumerate(groups))
+    group_by = "".join(f", `group_{i}`" for i in range(len(groups)))
+
+    if stype == "time":
+        g = granularity(range_s)
+        return (
+            f"SELECT toStartOfInterval({key_col}, INTERVAL {g} SECOND) AS bucket{group_cols}, "
+            f"{agg} AS value FROM {table} WHERE {where} GROUP BY bucket{group_by} ORDER BY bucket"
+        )
+    if stype == "table" and groups:
+        return (
+            f"SELECT {agg} AS value{group_cols} FROM {table} WHERE {where} "
+            f"GROUP BY {group_by.lstrip(', ')} ORDER BY value DESC LIMIT {TABLE_LIMIT}"
+        )
+    return f"SELECT {agg} AS value FROM {table} WHERE {where}"
+
+
+def dashboard_queries(paths: list[str], range_s: float, end_s: float | None = None) -> list[TileQuery]:
+    """One TileQuery per series of every tile in the given dashboards."""
+    queries = []
+    for path in paths:
+        for dashboard in load_dashboards(path):
+            for tile in dashboard.get("tiles", []):
+                series_list = tile.get("series", [])
+                for i, series in enumerate(series_list):
+                    sql = series_sql(series, range_s, end_s)
+                    if sql is None:
+                        continue
+                    name = tile.get("name", "?") + (f" [{i}]" if len(series_list) > 1 else "")
+                    queries.append(TileQuery(dashboard.get("name", path), name, sql))
+    return queries
+
+
+# ── Viewers ───────────────────────────────────────────────────────────────
+
+
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency_ms: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.error_samples: dict[str, str] = {}
+        self.refreshes = 0
+        self.refresh_ms: list[float] = []
+
+    def record(self, label: str, ms: float, error: str | None):
+        with self.lock:
+            if error:
+                self.errors[label] += 1
+                self.error_samples.setdefault(label, error)
+            else:
+                self.latency_ms[label].append(ms)
+
+
+def run_step(queries: list[TileQuery], viewers: int, duration_s: float, refresh_s: float,
+             tile_concurrency: int, url: str | None) -> LoadStats:
+    """Run `viewers` virtual viewers for duration_s; each refreshes every refresh_s."""
+    stats = LoadStats()
+    stop = threading.Event()
+    local = threading.local()
+    pool = ThreadPoolExecutor(max_workers=viewers * tile_concurrency)
+
+    def run_query(q: TileQuery):
+        if not hasattr(local, "ch"):
+            local.ch = ClickHouseHTTP(url=url, timeout=120)
+        start = time.perf_counter()
+        error = None
+        try:
+            local.ch.execute(
+                f"{q.sql}\nFORMAT JSONCompact", log_comment=f"dashboard_load: {q.label}"[:200],
+            )
+        except (ClickHouseError, requests.RequestException) as e:
+            error = str(e)[:300]
+        stats.record(q.label, (time.perf_counter() - start) * 1000, error)
+
+    def viewer(n: int):
+        # Stagger viewers so refreshes don't all land at once
+        if stop.wait(random.Random(n).random() * refresh_s):
+            return
+        sem = threading.Semaphore(tile_concurrency)
+
+        def limited(q: TileQuery):
+            try:
+                run_query(q)
+            finally:
+                sem.release()
+
+        while not stop.is_set():
+            start = time.perf_counter()
+            futures = []
+            for q in queries:
+                sem.acquire()
+                futures.append(pool.submit(limited, q))
+            wait(futures)
+            elapsed = time.perf_counter() - start
+            with stats.lock:
+                stats.refreshes += 1
+                stats.refresh_ms.append(elapsed * 1000)
+            stop.wait(max(0.0, refresh_s - elapsed))
+
+    threads = [threading.Thread(target=viewer, args=(n,), daemon=True) for n in range(viewers)]
+    for t in threads:
+        t.start()
+    try:
+        stop.wait(duration_s)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        pool.shutdown(wait=True)
+    return stats
+
+
+def print_step(viewers: int, stats: LoadStats, duration_s: float, show_tiles: bool) -> dict:
+    all_ms = sorted(ms for v in stats.latency_ms.values() for ms in v)
+    ok = len(all_ms)
+    errors = sum(stats.errors.values())
+    refresh = sorted(stats.refresh_ms)
+    summary = {
+        "viewers": viewers, "qps": (ok + errors) / duration_s,
+        "p50": percentile(all_ms, 50), "p95": percentile(all_ms, 95), "p99": percentile(all_ms, 99),
+        "refresh_p95": percentile(refresh, 95), "errors": errors, "queries": ok + errors,
+    }
+    print(
+        f"\n{viewers} viewer(s): {summary['queries']} queries ({summary['qps']:.1f}/s), "
+        f"{stats.refreshes} dashboard refreshes (p95 {summary['refresh_p95']:.0f} ms), {errors} errors"
+    )
+    if show_tiles:
+        print(f"  {'tile':<58} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>5}")
+        labels = sorted(set(stats.latency_ms) | set(stats.errors),
+                        key=lambda k: -percentile(sorted(stats.latency_ms.get(k, [0])), 95))
+        for label in labels:
+            lat = sorted(stats.latency_ms.get(label, []))
+            print(f"  {label[:58]:<58} {len(lat):>6} {percentile(lat, 50):>8.1f} "
+                  f"{percentile(lat, 95):>8.1f} {percentile(lat, 99):>8.1f} {stats.errors.get(label, 0):>5}")
+    for label, sample in stats.error_samples.items():
+        print(f"  ERROR {label}: {sample}", file=sys.stderr)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent dashboard viewer load simulator")
+    parser.add_argument("dashboards", nargs="*", help="Dashboard .py scripts or .json files")
+    parser.add_argument("--viewers", default="1,5,10,25", help="Comma-separated viewer counts to step through")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds per step (default: 60)")
+    parser.add_argument("--refresh", type=float, default=10, help="Seconds between refreshes per viewer")
+    parser.add_argument("--range", default="1h", help="Dashboard time range, e.g. 15m, 1h, 7d (default: 1h)")
+    parser.add_argument("--tile-concurrency", type=int, default=6, help="Queries in flight per viewer")
+    parser.add_argument("--url", help="ClickHouse HTTP URL (default: CLICKHOUSE_URL or :8123)")
+    parser.add_argument("--with-stream", metavar="ARGS", help="Run stream_data.py ARGS during the test")
+    parser.add_argument("--summary-only", action="store_true", help="Skip the per-tile tables")
+    parser.add_argument("--print-sql", action="store_true", help="Print each tile's SQL and exit")
+    args = parser.parse_args()
+
+    try:
+        range_s = parse_duration(args.range)
+        steps = [int(v) for v in args.viewers.split(",") if v.strip()]
+        queries = dashboard_queries(
+            args.dashboards or [str(REPO_DIR / p) for p in DEFAULT_DASHBOARDS], range_s,
+        )
+    except (ValueError, lucene.LuceneSyntaxError) as e:
+        sys.exit(f"  ERROR: {e}")
+
+    if args.print_sql:
+        for q in queries:
+            print(f"-- {q.label}\n{q.sql};\n")
+        return
+
+    print(f"{len(queries)} tile queries, range {args.range}, refresh every {args.refresh:g}s, "
+          f"steps {steps} x {args.duration:g}s")
+    stream = None
+    if args.with_stream is not None:
+        stream = subprocess.Popen(
+            [sys.executable, str(REPO_DIR / "stream_data.py"), "--quiet", *shlex.split(args.with_stream)],
+            stdout=subprocess.DEVNULL,
+        )
+        print(f"Started stream_data.py (pid {stream.pid})")
+
+    results = []
+    try:
+        for viewers in steps:
+            stats = run_step(queries, viewers, args.duration, args.refresh, args.tile_concurrency, args.url)
+            results.append(print_step(viewers, stats, args.duration, not args.summary_only))
+    except KeyboardInterrupt:
+        print("\nInterrupted")
+    finally:
+        if stream:
+            stream.terminate()
+            stream.wait(10)
+
+    if results:
+        print(f"\n{'viewers':>7} {'queries/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'refresh p95':>12} {'errors':>7}")
+        for r in results:
+            print(f"{r['viewers']:>7} {r['qps']:>10.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+                  f"{r['p99']:>8.1f} {r['refresh_p95']:>12.0f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Export a time window from ClickHouse into a capture that stream_data.py can replay.
+
+Streams `SELECT ... FORMAT JSONEachRow` from otel_traces, otel_logs and the
+otel_metrics_* tables, converts rows back into OTLP JSON (one line per
+chunk of rows, grouped by resource and scope) and writes traces.json,
+logs.json and metrics.json as a sample.tar.gz-compatible archive or a plain
+NDJSON directory. Rows are processed one chunk at a time, so memory stays
+flat however large the window is; the signal files are staged on disk
+before being added to the archive.
+
+Usage:
+    python export_capture.py --from "2025-10-20 17:00" --to "2025-10-20 18:00" --out incident.tar.gz
+    python export_capture.py --last 30m --service checkout --service payment --out capture/
+    python export_capture.py --last 2h --signals logs --where "SeverityText = 'ERROR'"
+    python stream_data.py --input incident.tar.gz --cycle 60    # Replay it
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import requests
+from dotenv import load_dotenv
+
+from clickhouse_http import ClickHouseError, ClickHouseHTTP, quote
+
+load_dotenv()
+
+CHUNK_ROWS = 500
+METRIC_TABLES = ("gauge", "sum", "histogram", "summary")
+DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+SPAN_KINDS = {
+    "SPAN_KIND_UNSPECIFIED": 0, "SPAN_KIND_INTERNAL": 1, "SPAN_KIND_SERVER": 2,
+    "SPAN_KIND_CLIENT": 3, "SPAN_KIND_PRODUCER": 4, "SPAN_KIND_CONSUMER": 5,
+}
+STATUS_CODES = {"STATUS_CODE_UNSET": 0, "STATUS_CODE_OK": 1, "STATUS_CODE_ERROR": 2}
+AGG_TEMPORALITY = {
+    "AGGREGATION_TEMPORALITY_UNSPECIFIED": 0, "AGGREGATION_TEMPORALITY_DELTA": 1,
+    "AGGREGATION_TEMPORALITY_CUMULATIVE": 2,
+}
+
+# (output name, SQL expression, source column that must exist)
+TRACE_COLUMNS = [
+    ("ts", "toUnixTimestamp64Nano(Timestamp)", "Timestamp"),
+    ("TraceId", "TraceId", "TraceId"),
+    ("SpanId", "SpanId", "SpanId"),
+    ("ParentSpanId", "ParentSpanId", "ParentSpanId"),
+    ("TraceState", "TraceState", "TraceState"),
+    ("SpanName", "SpanName", "SpanName"),
+    ("SpanKind", "SpanKind", "SpanKind"),
+    ("ServiceName", "ServiceName", "ServiceName"),
+    ("ResourceAttributes", "ResourceAttributes", "ResourceAttributes"),
+    ("ScopeName", "ScopeName", "ScopeName"),
+    ("ScopeVersion", "ScopeVersion", "ScopeVersion"),
+    ("SpanAttributes", "SpanAttributes", "SpanAttributes"),
+    ("Duration", "Duration", "Duration"),
+    ("StatusCode", "StatusCode", "StatusCode"),
+    ("StatusMessage", "StatusMessage", "StatusMessage"),
+    ("event_ts", "arrayMap(t -> toUnixTimestamp64Nano(t), `Events.Timestamp`)", "Events.Timestamp"),
+    ("event_names", "`Events.Name`", "Events.Name"),
+    ("event_attrs", "`Events.Attributes`", "Events.Attributes"),
+    ("link_trace_ids", "`Links.TraceId`", "Links.TraceId"),
+    ("link_span_ids", "`Links.SpanId`", "Links.SpanId"),
+    ("link_states", "`Links.TraceState`", "Links.TraceState"),
+    ("link_attrs", "`Links.Attributes`", "Links.Attributes"),
+]
+LOG_COLUMNS = [
+    ("ts", "toUnixTimestamp64Nano(Timestamp)", "Timestamp"),
+    ("TraceId", "TraceId", "TraceId"),
+    ("SpanId", "SpanId", "SpanId"),
+    ("TraceFlags", "TraceFlags", "TraceFlags"),
+    ("SeverityText", "SeverityText", "SeverityText"),
+    ("SeverityNumber", "SeverityNumber", "SeverityNumber"),
+    ("ServiceName", "ServiceName", "ServiceName"),
+    ("Body", "Body", "Body"),
+    ("ResourceSchemaUrl", "ResourceSchemaUrl", "ResourceSchemaUrl"),
+    ("ResourceAttributes", "ResourceAttributes", "ResourceAttributes"),
+    ("ScopeSchemaUrl", "ScopeSchemaUrl", "ScopeSchemaUrl"),
+    ("ScopeName", "ScopeName", "ScopeName"),
+    ("ScopeVersion", "ScopeVersion", "ScopeVersion"),
+    ("ScopeAttributes", "ScopeAttributes", "ScopeAttributes"),
+    ("LogAttributes", "LogAttributes", "LogAttributes"),
+]
+METRIC_COMMON = [
+    ("ResourceAttributes", "ResourceAttributes", "ResourceAttributes"),
+    ("ResourceSchemaUrl", "ResourceSchemaUrl", "ResourceSchemaUrl"),
+    ("ScopeName", "ScopeName", "ScopeName"),
+    ("ScopeVersion", "ScopeVersion", "ScopeVersion"),
+    ("ScopeAttributes", "ScopeAttributes", "ScopeAttributes"),
+    ("ServiceName", "ServiceName", "ServiceName"),
+    ("MetricName", "MetricName", "MetricName"),
+    ("MetricDescription", "MetricDescription", "MetricDescription"),
+    ("MetricUnit", "MetricUnit", "MetricUnit"),
+    ("Attributes", "Attributes", "Attributes"),
+    ("start_ts", "toUnixTimestamp64Nano(StartTimeUnix)", "StartTimeUnix"),
+    ("ts", "toUnixTimestamp64Nano(TimeUnix)", "TimeUnix"),
+    ("Flags", "Flags", "Flags"),
+    ("AggregationTemporality", "AggregationTemporality", "AggregationTemporality"),
+    ("IsMonotonic", "IsMonotonic", "IsMonotonic"),
+]
+METRIC_VALUE_COLUMNS = {
+    "gauge": [("Value", "Value", "Value")],
+    "sum": [("Value", "Value", "Value")],
+    "histogram": [
+        ("Count", "Count", "Count"), ("Sum", "Sum", "Sum"),
+        ("BucketCounts", "BucketCounts", "BucketCounts"),
+        ("ExplicitBounds", "ExplicitBounds", "ExplicitBounds"),
+        ("Min", "Min", "Min"), ("Max", "Max", "Max"),
+    ],
+    "summary": [
+        ("Count", "Count", "Count"), ("Sum", "Sum", "Sum"),
+        ("quantiles", "`ValueAtQuantiles.Quantile`", "ValueAtQuantiles.Quantile"),
+        ("quantile_values", "`ValueAtQuantiles.Value`", "ValueAtQuantiles.Value"),
+    ],
+}
+
+
+# ── Row -> OTLP conversion ────────────────────────────────────────────────
+
+
+def _attrs(m: dict | None) -> list[dict]:
+    return [{"key": k, "value": {"stringValue": v}} for k, v in (m or {}).items()]
+
+
+def _enum(value, table: dict[str, int]) -> int:
+    if isinstance(value, int):
+        return value
+    text = str(value or "")
+    if text.isdigit():
+        return int(text)
+    # Accept both "SPAN_KIND_SERVER" and short forms like "Server"
+    for name, number in table.items():
+        if text.upper() == name or name.endswith("_" + text.upper()):
+            return number
+    return 0
+
+
+def _resource_key(row: dict) -> str:
+    return json.dumps(
+        [sorted((row.get("ResourceAttributes") or {}).items()), row.get("ResourceSchemaUrl", "")]
+    )
+
+
+def _scope_key(row: dict) -> str:
+    return json.dumps([
+        row.get("ScopeName", ""), row.get("ScopeVersion", ""),
+        sorted((row.get("ScopeAttributes") or {}).items()),
+    ])
+
+
+def _group(rows: list[dict], res_key: str, scope_key: str, items_key: str, convert) -> str:
+    """One OTLP payload line with rows grouped by resource, then scope.
+
+    convert(row) returns the item to append, or None if it merged the row
+    into an item it returned earlier.
+    """
+    resources: dict[str, dict] = {}
+    for row in rows:
+        rkey = _resource_key(row)
+        res = resources.get(rkey)
+        if res is None:
+            res = resources[rkey] = {
+                "resource": {"attributes": _attrs(row.get("ResourceAttributes"))},
+                "schemaUrl": row.get("ResourceSchemaUrl", ""),
+                "_scopes": {},
+            }
+        skey = _scope_key(row)
+        scope = res["_scopes"].get(skey)
+        if scope is None:
+            scope = res["_scopes"][skey] = {
+                "scope": {
+                    "name": row.get("ScopeName", ""), "version": row.get("ScopeVersion", ""),
+                    "attributes": _attrs(row.get("ScopeAttributes")),
+                },
+                items_key: [],
+            }
+        item = convert(row)
+        if item is not None:
+            scope[items_key].append(item)
+    out = []
+    for res in resources.values():
+        res[scope_key] = list(res.pop("_scopes").values())
+        out.append(res)
+    return json.dumps({res_key: out}, separators=(",", ":"))
+
+
+def span_from_row(row: dict) -> dict:
+    start = int(row["ts"])
+    span = {
+        "traceId": row.get("TraceId", ""),
+        "spanId": row.get("SpanId", ""),
+        "parentSpanId": row.get("ParentSpanId", ""),
+        "traceState": row.get("TraceState", ""),
+        "name": row.get("SpanName", ""),
+        "kind": _enum(row.get("SpanKind"), SPAN_KINDS),
+        "startTimeUnixNano": str(start),
+        "endTimeUnixNano": str(start + int(row.get("Duration") or 0)),
+        "attributes": _attrs(row.get("SpanAttributes")),
+        "status": {
+            "code": _enum(row.get("StatusCode"), STATUS_CODES),
+            "message": row.get("StatusMessage", ""),
+        },
+    }
+    events = [
+        {"timeUnixNano": str(ts), "name": name, "attributes": _attrs(attrs)}
+        for ts, name, attrs in zip(
+            row.get("event_ts") or [], row.get("event_names") or [], row.get("event_attrs") or [],
+        )
+    ]
+    if events:
+        span["events"] = events
+    links = [
+        {"traceId": tid, "spanId": sid, "traceState": state, "attributes": _attrs(attrs)}
+        for tid, sid, state, attrs in zip(
+            row.get("link_trace_ids") or [], row.get("link_span_ids") or [],
+            row.get("link_states") or [], row.get("link_attrs") or [],
+        )
+    ]
+    if links:
+        span["links"] = links
+    return span
+
+
+def log_from_row(row: dict) -> dict:
+    record = {
+        "timeUnixNano": str(row["ts"]),
+        "observedTimeUnixNano": str(row["ts"]),
+        "severityNumber": int(row.get("SeverityNumber") or 0),
+        "severityText": row.get("SeverityText", ""),
+        "body": {"stringValue": row.get("Body", "")},
+        "attributes": _attrs(row.get("LogAttributes")),
+        "flags": int(row.get("TraceFlags") or 0),
+    }
+    if row.get("TraceId"):
+        record["traceId"] = row["TraceId"]
+    if row.get("SpanId"):
+        record["spanId"] = row["SpanId"]
+    return record
+
+
+def _data_point(kind: str, row: dict) -> dict:
+    dp = {
+        "attributes": _attrs(row.get("Attributes")),
+        "timeUnixNano": str(row["ts"]),
+        "flags": int(row.get("Flags") or 0),
+    }
+    # JSONEachRow returns UInt64 as strings, so "0" (gauges) is truthy;
+    # an unset start time is omitted rather than replayed as epoch 0
+    start_ns = int(row.get("start_ts") or 0)
+    if start_ns:
+        dp["startTimeUnixNano"] = str(start_ns)
+    if kind in ("gauge", "sum"):
+        dp["asDouble"] = row.get("Value")
+    elif kind == "histogram":
+        dp.update(
+            count=str(row.get("Count", 0)), sum=row.get("Sum"),
+            bucketCounts=[str(c) for c in row.get("BucketCounts") or []],
+            explicitBounds=row.get("ExplicitBounds") or [],
+        )
+        if row.get("Min") is not None:
+            dp["min"] = row["Min"]
+        if row.get("Max") is not None:
+            dp["max"] = row["Max"]
+    elif kind == "summary":
+        dp.update(
+            count=str(row.get("Count", 0)), sum=row.get("Sum"),
+            quantileValues=[
+                {"quantile": q, "value": v}
+                for q, v in zip(row.get("quantiles") or [], row.get("quantile_values") or [])
+            ],
+        )
+    return dp
+
+
+def metrics_line(kind: str, rows: list[dict]) -> str:
+    """Group metric rows into resourceMetrics/scopeMetrics/metrics/dataPoints."""
+    metric_index: dict[tuple, dict] = {}
+
+    def convert(row: dict) -> dict | None:
+        key = (_resource_key(row), _scope_key(row), row.get("MetricName", ""))
+        metric = metric_index.get(key)
+        if metric is not None:
+            metric[kind]["dataPoints"].append(_data_point(kind, row))
+            return None
+        body: dict = {"dataPoints": [_data_point(kind, row)]}
+        if kind in ("sum", "histogram"):
+            body["aggregationTemporality"] = _enum(row.get("AggregationTemporality"), AGG_TEMPORALITY)
+        if kind == "sum":
+            body["isMonotonic"] = bool(row.get("IsMonotonic"))
+        metric = metric_index[key] = {
+            "name": row.get("MetricName", ""),
+            "description": row.get("MetricDescription", ""),
+            "unit": row.get("MetricUnit", ""),
+            kind: body,
+        }
+        return metric
+
+    return _group(rows, "resourceMetrics", "scopeMetrics", "metrics", convert)
+
+
+# ── Export ────────────────────────────────────────────────────────────────
+
+
+def parse_time(value: str) -> int:
+    """ISO date/time (UTC unless an offset is given) or epoch seconds -> ns."""
+    try:
+        return int(float(value) * 1e9)
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()) * 10**9 + dt.microsecond * 1000
+
+
+def _select(ch: ClickHouseHTTP, table: str, columns: list[tuple[str, str, str]],
+            time_col: str, start_ns: int, end_ns: int, services: list[str], where: str | None) -> str:
+    present = {
+        row["name"] for row in ch.query(
+            f"SELECT name FROM system.columns WHERE database = currentDatabase() AND table = {quote(table)}"
+        )
+    }
+    if not present:
+        return ""
+    exprs = [f"{expr} AS `{name}`" for name, expr, source in columns if source in present]
+    conditions = [
+        f"{time_col} >= fromUnixTimestamp64Nano(toInt64({start_ns}))",
+        f"{time_col} < fromUnixTimestamp64Nano(toInt64({end_ns}))",
+    ]
+    order = ["ServiceName", time_col]
+    if "TimestampTime" in present:
+        # otel_logs is partitioned and sorted by the second-granularity
+        # TimestampTime; bound it too so parts and granules are pruned
+        conditions[:0] = [
+            f"TimestampTime >= toDateTime({start_ns // 10**9})",
+            f"TimestampTime <= toDateTime({end_ns // 10**9})",
+        ]
+        order.insert(1, "TimestampTime")
+    if services:
+        conditions.append(f"ServiceName IN ({', '.join(quote(s) for s in services)})")
+    if where:
+        conditions.append(f"({where})")
+    # ServiceName first matches the tables' sort keys and keeps resources together
+    return (
+        f"SELECT {', '.join(exprs)} FROM {table} WHERE {' AND '.join(conditions)} "
+        f"ORDER BY {', '.join(order)}"
+    )
+
+
+def export_table(ch: ClickHouseHTTP, sql: str, out, to_line, chunk_rows: int) -> tuple[int, int, int]:
+    """Stream sql, writing one OTLP line per chunk; returns (rows, lines, bytes)."""
+    rows = lines = nbytes = 0
+    chunk: list[dict] = []
+
+    def flush():
+        nonlocal lines, nbytes
+        line = to_line(chunk) + "\n"
+        out.write(line)
+        lines += 1
+        nbytes += len(line)
+        chunk.clear()
+
+    for row in ch.stream(sql):
+        chunk.append(row)
+        rows += 1
+        if len(chunk) >= chunk_rows:
+            flush()
+    if chunk:
+        flush()
+    return rows, lines, nbytes
+
+
+def export(ch: ClickHouseHTTP, out_dir: str, signals: set[str], start_ns: int, end_ns: int,
+           services: list[str], where: str | None, chunk_rows: int = CHUNK_ROWS) -> dict[str, tuple]:
+    """Write traces.json / logs.json / metrics.json into out_dir."""
+    summary = {}
+    plans = []
+    if "traces" in signals:
+        plans.append(("traces", "otel_traces", TRACE_COLUMNS, "Timestamp",
+                      lambda rows: _group(rows, "resourceSpans", "scopeSpans", "spans", span_from_row)))
+    if "logs" in signals:
+        plans.append(("logs", "otel_logs", LOG_COLUMNS, "Timestamp",
+                      lambda rows: _group(rows, "resourceLogs", "scopeLogs", "logRecords", log_from_row)))
+    if "metrics" in signals:
+        for kind in METRIC_TABLES:
+            plans.append(("metrics", f"otel_metrics_{kind}", METRIC_COMMON + METRIC_VALUE_COLUMNS[kind],
+                          "TimeUnix", lambda rows, kind=kind: metrics_line(kind, rows)))
+
+    files = {}
+    try:
+        for signal, table, columns, time_col, to_line in plans:
+            sql = _select(ch, table, columns, time_col, start_ns, end_ns, services, where)
+            if not sql:
+                print(f"  {table}: not found, skipped", file=sys.stderr)
+                continue
+            if signal not in files:
+                files[signal] = open(os.path.join(out_dir, f"{signal}.json"), "w", encoding="utf-8")
+            start = time.perf_counter()
+            rows, lines, nbytes = export_table(ch, sql, files[signal], to_line, chunk_rows)
+            elapsed = time.perf_counter() - start
+            print(f"  {table:<26} {rows:>10,} rows -> {lines:>7,} lines, "
+                  f"{nbytes / 1e6:>8.1f} MB in {elapsed:.1f}s")
+            prev = summary.get(signal, (0, 0, 0))
+            summary[signal] = (prev[0] + rows, prev[1] + lines, prev[2] + nbytes)
+    finally:
+        for f in files.values():
+            f.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a ClickHouse time window as a replayable OTLP capture")
+    parser.add_argument("--from", dest="start", help="Window start: ISO time (UTC) or epoch seconds")
+    parser.add_argument("--to", dest="end", help="Window end (default: now)")
+    parser.add_argument("--last", help="Window ending now, e.g. 15m, 2h, 1d (instead of --from)")
+    parser.add_argument("--service", action="append", default=[], help="Only these services (repeatable)")
+    parser.add_argument("--where", help="Extra SQL condition applied to every table")
+    parser.add_argument("--signals", default="traces,logs,metrics", help="Comma-separated signals to export")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS, help=f"Rows per OTLP line (default: {CHUNK_ROWS})")
+    parser.add_argument(
+        "--out", default="capture.tar.gz",
+        help="Output .tar.gz (replayable with stream_data.py --input) or a directory",
+    )
+    args = parser.parse_args()
+
+    try:
+        end_ns = parse_time(args.end) if args.end else time.time_ns()
+        if args.last:
+            m = DURATION_RE.match(args.last)
+            if not m:
+                sys.exit(f"--last: expected e.g. 30m, 2h, 1d; got {args.last!r}")
+            start_ns = end_ns - int(float(m.group(1)) * DURATION_UNITS[m.group(2)] * 1e9)
+        elif args.start:
+            start_ns = parse_time(args.start)
+        else:
+            sys.exit("Give --from or --last")
+    except ValueError as e:
+        sys.exit(f"  ERROR: bad time: {e}")
+    signals = {s.strip() for s in args.signals.split(",") if s.strip()}
+    if not signals <= {"traces", "logs", "metrics"}:
+        sys.exit("--signals: choose from traces, logs, metrics")
+
+    as_dir = not args.out.endswith((".tar.gz", ".tgz"))
+    out_dir = args.out if as_dir else tempfile.mkdtemp(prefix="export-", dir=os.path.dirname(os.path.abspath(args.out)))
+    os.makedirs(out_dir, exist_ok=True)
+    window = (
+        f"{datetime.fromtimestamp(start_ns / 1e9, timezone.utc):%Y-%m-%d %H:%M:%S} -> "
+        f"{datetime.fromtimestamp(end_ns / 1e9, timezone.utc):%Y-%m-%d %H:%M:%S} UTC"
+    )
+    print(f"Exporting {', '.join(sorted(signals))} for {window}")
+
+    ch = ClickHouseHTTP(timeout=3600)
+    try:
+        summary = export(ch, out_dir, signals, start_ns, end_ns, args.service, args.where, args.chunk)
+        if not as_dir:
+            with tarfile.open(args.out, "w:gz") as tar:
+                for signal in ("traces", "logs", "metrics"):
+                    path = os.path.join(out_dir, f"{signal}.json")
+                    if os.path.exists(path):
+                        tar.add(path, arcname=f"{signal}.json")
+    except (ClickHouseError, requests.RequestException) as e:
+        sys.exit(f"  ERROR: export failed: {e}")
+    finally:
+        if not as_dir:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    total_rows = sum(s[0] for s in summary.values())
+    print(f"Wrote {total_rows:,} records to {args.out}")
+    print(f"Replay with: python stream_data.py --input {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Ingest-to-visibility lag measurement for stream_data.py --freshness.
+
+A FreshnessProbe periodically sends one marker span and one marker log
+carrying a unique `stream.marker_id` attribute and its send time, then polls
+ClickHouse until each marker is queryable. Polls filter on the leading
+ORDER BY columns of otel_traces / otel_logs (ServiceName, then time), so
+they only touch the few granules holding recent probe rows.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+
+import requests
+
+from clickhouse_http import ClickHouseError, ClickHouseHTTP, percentile
+
+PROBE_SERVICE = "stream-freshness-probe"
+MARKER_ATTR = "stream.marker_id"
+
+# Markers not visible after this many seconds are reported as missing
+MARKER_TIMEOUT_S = 120.0
+POLL_INTERVAL_S = 0.25
+
+PROBE_SIGNALS = ("traces", "logs")
+
+
+def _attr(key: str, value: str) -> dict:
+    return {"key": key, "value": {"stringValue": value}}
+
+
+def build_marker_payload(signal_type: str, marker_id: str, ts_ns: int) -> dict:
+    """Build a one-record OTLP payload carrying the marker attribute."""
+    resource = {"attributes": [_attr("service.name", PROBE_SERVICE)]}
+    attrs = [_attr(MARKER_ATTR, marker_id), _attr("stream.sent_ns", str(ts_ns))]
+    if signal_type == "traces":
+        return {"resourceSpans": [{"resource": resource, "scopeSpans": [{"spans": [{
+            "traceId": uuid.uuid4().hex,
+            "spanId": uuid.uuid4().hex[:16],
+            "name": "freshness-marker",
+            "kind": 1,
+            "startTimeUnixNano": str(ts_ns),
+            "endTimeUnixNano": str(ts_ns),
+            "attributes": attrs,
+        }]}]}]}
+    return {"resourceLogs": [{"resource": resource, "scopeLogs": [{"logRecords": [{
+        "timeUnixNano": str(ts_ns),
+        "observedTimeUnixNano": str(ts_ns),
+        "severityNumber": 9,
+        "severityText": "INFO",
+        "body": {"stringValue": f"freshness marker {marker_id}"},
+        "attributes": attrs,
+    }]}]}]}
+
+
+MARKER_QUERIES = {
+    "traces": (
+        "SELECT SpanAttributes['{attr}'] AS marker FROM otel_traces "
+        "WHERE ServiceName = '{service}' AND SpanName = 'freshness-marker' "
+        "AND Timestamp >= fromUnixTimestamp64Nano(toInt64({since_ns}))"
+    ),
+    "logs": (
+        "SELECT LogAttributes['{attr}'] AS marker FROM otel_logs "
+        "WHERE ServiceName = '{service}' "
+        "AND TimestampTime >= toDateTime({since_s}) "
+        "AND Timestamp >= fromUnixTimestamp64Nano(toInt64({since_ns}))"
+    ),
+}
+
+
+class FreshnessProbe:
+    """Inject markers every `interval` seconds and measure when they become visible."""
+
+    def __init__(self, otlp_endpoint: str, api_key: str, interval: float,
+                 clickhouse: ClickHouseHTTP | None = None):
+        self.otlp_endpoint = otlp_endpoint
+        self.interval = interval
+        self.clickhouse = clickhouse or ClickHouseHTTP(timeout=5)
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "authorization": api_key,
+        })
+        self.run_id = uuid.uuid4().hex[:8]
+        # (signal, marker_id) -> send time (wall clock seconds)
+        self.pending: dict[tuple[str, str], float] = {}
+        self.lags: dict[str, list[float]] = {s: [] for s in PROBE_SIGNALS}
+        self.missing = {s: 0 for s in PROBE_SIGNALS}
+        self.send_errors = 0
+        self.query_errors = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> "FreshnessProbe":
+        for target in (self._inject_loop, self._poll_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, drain_s: float = 10.0):
+        """Stop injecting, wait up to drain_s for in-flight markers, stop polling."""
+        self._stop.set()
+        deadline = time.time() + drain_s
+        while time.time() < deadline:
+            with self._lock:
+                if not self.pending:
+                    break
+            self._poll_once()
+            time.sleep(POLL_INTERVAL_S)
+        for t in self._threads:
+            t.join(timeout=2)
+
+    def _inject_loop(self):
+        seq = 0
+        while not self._stop.is_set():
+            seq += 1
+            for signal_type in PROBE_SIGNALS:
+                marker_id = f"{self.run_id}-{seq}-{signal_type}"
+                sent = time.time()
+                payload = build_marker_payload(signal_type, marker_id, int(sent * 1e9))
+                try:
+                    r = self.session.post(
+                        f"{self.otlp_endpoint}/v1/{signal_type}", json=payload, timeout=5,
+                    )
+                    ok = r.status_code < 400
+                except requests.RequestException:
+                    ok = False
+                with self._lock:
+                    if ok:
+                        self.pending[(signal_type, marker_id)] = sent
+                    else:
+                        self.send_errors += 1
+            self._stop.wait(self.interval)
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            self._poll_once()
+            self._stop.wait(POLL_INTERVAL_S)
+
+    def _poll_once(self):
+        with self._lock:
+            pending = dict(self.pending)
+        if not pending:
+            return
+        for signal_type in PROBE_SIGNALS:
+            sent_times = [t for (sig, _), t in pending.items() if sig == signal_type]
+            if not sent_times:
+                continue
+            since = min(sent_times) - 1
+            sql = MARKER_QUERIES[signal_type].format(
+                attr=MARKER_ATTR, service=PROBE_SERVICE,
+                since_ns=int(since * 1e9), since_s=int(since),
+            )
+            try:
+                rows = self.clickhouse.query(sql)
+            except (ClickHouseError, requests.RequestException):
+                with self._lock:
+                    self.query_errors += 1
+                continue
+            seen_at = time.time()
+            visible = {row["marker"] for row in rows}
+            with self._lock:
+                for key, sent in list(self.pending.items()):
+                    if key[0] != signal_type:
+                        continue
+                    if key[1] in visible:
+                        self.lags[signal_type].append(seen_at - sent)
+                        del self.pending[key]
+                    elif seen_at - sent > MARKER_TIMEOUT_S:
+                        self.missing[signal_type] += 1
+                        del self.pending[key]
+
+    def summary(self) -> str:
+        """One-line p50/p95 lag per signal for periodic progress output."""
+        parts = []
+        with self._lock:
+            for signal_type in PROBE_SIGNALS:
+                lags = sorted(self.lags[signal_type])
+                if lags:
+                    parts.append(
+                        f"{signal_type} p50 {percentile(lags, 50):.1f}s "
+                        f"p95 {percentile(lags, 95):.1f}s"
+                    )
+        return "freshness: " + (", ".join(parts) if parts else "waiting for markers")
+
+    def report(self) -> str:
+        """Multi-line lag percentile table for the end-of-run summary."""
+        lines = [
+            f"Ingest-to-visibility lag (markers every {self.interval:g}s, "
+            f"poll resolution {POLL_INTERVAL_S:g}s):",
+            f"  {'signal':<8} {'seen':>5} {'p50':>7} {'p90':>7} {'p95':>7} "
+            f"{'p99':>7} {'max':>7} {'missing':>8} {'pending':>8}",
+        ]
+        with self._lock:
+            for signal_type in PROBE_SIGNALS:
+                lags = sorted(self.lags[signal_type])
+                pending = sum(1 for sig, _ in self.pending if sig == signal_type)
+                cols = " ".join(
+                    f"{percentile(lags, p):>6.2f}s" for p in (50, 90, 95, 99, 100)
+                ) if lags else " ".join(f"{'-':>7}" for _ in range(5))
+                lines.append(
+                    f"  {signal_type:<8} {len(lags):>5} {cols} "
+                    f"{self.missing[signal_type]:>8} {pending:>8}"
+                )
+            if self.send_errors or self.query_errors:
+                lines.append(
+                    f"  ({self.send_errors} marker send errors, "
+                    f"{self.query_errors} ClickHouse query errors)"
+                )
+        return "\n".join(lines)
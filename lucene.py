@@ -0,0 +1,203 @@
+"""
+Small parser for the Lucene `where` subset used in ClickStack dashboards,
+plus a translation to ClickHouse SQL for replaying tile queries.
+
+Supports `field:value`, `field:"phrase"`, `field:>=10`, wildcards (`5*`),
+bare terms/phrases, implicit AND (space), `AND`, `OR`, `NOT` / `-` and
+parentheses, with precedence NOT > AND > OR. Map attributes use dot
+notation (`LogAttributes.status:500`).
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, Union
+
+from clickhouse_http import quote
+
+
+class LuceneSyntaxError(ValueError):
+    """Raised for where clauses outside the supported subset."""
+
+
+@dataclass
+class Term:
+    field: str | None     # None for bare full-text terms
+    op: str               # ':' or one of '>', '>=', '<', '<='
+    value: str
+    phrase: bool = False  # value was quoted
+
+    @property
+    def wildcard(self) -> bool:
+        return not self.phrase and ("*" in self.value or "?" in self.value)
+
+
+@dataclass
+class Not:
+    node: "Node"
+
+
+@dataclass
+class And:
+    nodes: list["Node"]
+
+
+@dataclass
+class Or:
+    nodes: list["Node"]
+
+
+Node = Union[Term, Not, And, Or]
+
+TOKEN_RE = re.compile(
+    r'\s*(?:(?P<lparen>\()|(?P<rparen>\))|(?P<minus>-)(?=\S)'
+    r'|(?P<term>(?:[A-Za-z_@][\w.@\-\[\]\']*:(?:>=|<=|>|<)?)?(?:"(?:[^"\\]|\\.)*"|[^\s()"]+)))'
+)
+FIELD_RE = re.compile(r'^([A-Za-z_@][\w.@\-\[\]\']*):(>=|<=|>|<)?(.*)$', re.S)
+
+
+def _tokenize(where: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    where = where.strip()
+    while pos < len(where):
+        m = TOKEN_RE.match(where, pos)
+        if not m or m.end() == pos:
+            raise LuceneSyntaxError(f"cannot parse near: {where[pos:pos + 20]!r}")
+        kind = m.lastgroup
+        text = m.group(kind)
+        if kind == "term" and text in ("AND", "OR", "NOT", "&&", "||"):
+            kind = {"&&": "AND", "||": "OR"}.get(text, text)
+        tokens.append((kind, text))
+        pos = m.end()
+        while pos < len(where) and where[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def _term(text: str) -> Term:
+    m = FIELD_RE.match(text)
+    if m and not text.startswith('"'):
+        field, op, value = m.group(1), m.group(2) or ":", m.group(3)
+    else:
+        field, op, value = None, ":", text
+    phrase = len(value) >= 2 and value[0] == '"' and value[-1] == '"'
+    if phrase:
+        value = re.sub(r'\\(.)', r'\1', value[1:-1])
+    return Term(field, op, value, phrase)
+
+
+def parse(where: str) -> Node | None:
+    """Parse a where clause; returns None for an empty filter."""
+    tokens = _tokenize(where or "")
+    pos = 0
+
+    def peek():
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def parse_or() -> Node:
+        nonlocal pos
+        nodes = [parse_and()]
+        while peek() == "OR":
+            pos += 1
+            nodes.append(parse_and())
+        return nodes[0] if len(nodes) == 1 else Or(nodes)
+
+    def parse_and() -> Node:
+        nonlocal pos
+        nodes = [parse_not()]
+        while peek() not in (None, "OR", "rparen"):
+            if peek() == "AND":
+                pos += 1
+            nodes.append(parse_not())
+        return nodes[0] if len(nodes) == 1 else And(nodes)
+
+    def parse_not() -> Node:
+        nonlocal pos
+        if peek() in ("NOT", "minus"):
+            pos += 1
+            return Not(parse_not())
+        return parse_atom()
+
+    def parse_atom() -> Node:
+        nonlocal pos
+        kind = peek()
+        if kind == "lparen":
+            pos += 1
+            node = parse_or()
+            if peek() != "rparen":
+                raise LuceneSyntaxError("unbalanced parentheses")
+            pos += 1
+            return node
+        if kind == "term":
+            pos += 1
+            return _term(tokens[pos - 1][1])
+        raise LuceneSyntaxError(f"unexpected {tokens[pos][1]!r}" if kind else "unexpected end")
+
+    if not tokens:
+        return None
+    node = parse_or()
+    if pos != len(tokens):
+        raise LuceneSyntaxError(f"unexpected {tokens[pos][1]!r}")
+    return node
+
+
+def terms(node: Node | None) -> Iterator[Term]:
+    """Yield every Term in a parsed where clause."""
+    if node is None:
+        return
+    if isinstance(node, Term):
+        yield node
+    elif isinstance(node, Not):
+        yield from terms(node.node)
+    else:
+        for child in node.nodes:
+            yield from terms(child)
+
+
+# ── SQL translation ───────────────────────────────────────────────────────
+
+MAP_COLUMNS = {"SpanAttributes", "LogAttributes", "ResourceAttributes", "ScopeAttributes", "Attributes"}
+NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def field_sql(field: str) -> str:
+    """`LogAttributes.status` -> `LogAttributes['status']`; plain columns unchanged."""
+    col, _, key = field.partition(".")
+    if key and col in MAP_COLUMNS:
+        return f"{col}[{quote(key)}]"
+    return field if re.match(r"^[A-Za-z_]\w*(\[.*\])?$", field) else f"`{field}`"
+
+
+def _like_pattern(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "%").replace("?", "_")
+
+
+def to_sql(node: Node | None, default_field: str = "Body") -> str:
+    """Translate a parsed where clause to a ClickHouse boolean expression.
+
+    Approximates HyperDX's translation closely enough to cost about the same:
+    `field:value` is an equality (so sort-key columns still use the index),
+    wildcards become ILIKE, range operators compare numerically and bare
+    terms search default_field.
+    """
+    if node is None:
+        return "1"
+    if isinstance(node, Not):
+        return f"NOT ({to_sql(node.node, default_field)})"
+    if isinstance(node, (And, Or)):
+        joiner = " AND " if isinstance(node, And) else " OR "
+        return "(" + joiner.join(to_sql(n, default_field) for n in node.nodes) + ")"
+
+    if node.field is None:
+        return f"{default_field} ILIKE {quote('%' + _like_pattern(node.value) + '%')}"
+    column = field_sql(node.field)
+    if node.op != ":":
+        if NUMBER_RE.match(node.value):
+            return f"toFloat64OrNull(toString({column})) {node.op} {node.value}"
+        return f"{column} {node.op} {quote(node.value)}"
+    if node.wildcard:
+        return f"{column} ILIKE {quote(_like_pattern(node.value))}"
+    return f"{column} = {quote(node.value)}"
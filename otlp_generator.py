@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic OTLP traces, logs, metrics and NGINX access logs.
+
+Produces the same raw (signal_type, ts_ns, payload) tuples as the loaders in
+stream_data.py, so generated data feeds straight into the streaming loop
+(`stream_data.py --synthetic`). Payloads are built from pre-rendered string
+templates rather than json.dumps, and the timeline is generated in
+fixed-size partitions across a process pool, so output is identical for a
+given seed regardless of core count.
+
+Usage:
+    python otlp_generator.py --bench                       # Records/s on this host
+    python otlp_generator.py --out synthetic/              # Write NDJSON files
+    python otlp_generator.py --spec services=200,endpoints=50,cardinality=10000 --bench
+    python stream_data.py --synthetic services=50,tps=500  # Stream generated data
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+
+# Fixed origin for generated timelines; stream_data.py rewrites it to "now"
+BASE_TIME_NS = 1_700_000_000 * 10**9
+
+# Seconds of timeline generated per pool task
+PARTITION_SECONDS = 60
+
+SPAN_KINDS = (2, 3)  # SPAN_KIND_SERVER, SPAN_KIND_CLIENT
+HTTP_METHODS = ("GET", "GET", "GET", "POST", "PUT", "DELETE")
+HTTP_STATUSES = ("200", "200", "200", "200", "201", "204", "301", "404", "500", "503")
+USER_AGENTS = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) Safari/605.1.15",
+    "curl/8.4.0",
+    "python-requests/2.31.0",
+)
+
+
+@dataclass
+class GeneratorConfig:
+    """Scale, shape and cardinality knobs for the synthetic dataset."""
+
+    seconds: float = 600.0           # Length of the generated timeline
+    tps: float = 100.0               # Root traces started per second
+    services: int = 10               # Distinct ServiceName values
+    endpoints: int = 20              # Distinct span names / routes per service
+    cardinality: int = 1000          # Distinct values per high-cardinality attribute
+    attributes: int = 4              # Extra attributes per span / log record
+    fanout: int = 3                  # Max child spans per span
+    depth: int = 3                   # Max call-graph depth below the root
+    duration: str = "lognormal"      # lognormal | exponential | pareto | uniform
+    duration_ms: float = 50.0        # Median (lognormal) or mean span duration
+    sigma: float = 1.0               # Lognormal sigma / pareto alpha
+    error_rate: float = 0.02         # Fraction of spans with STATUS_CODE_ERROR
+    logs_per_span: float = 1.0       # Mean correlated log records per span
+    metric_interval: float = 10.0    # Seconds between metric data points
+    nginx_rps: float = 50.0          # NGINX access log records per second
+    batch: int = 100                 # Records per OTLP payload
+    seed: int = 0
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "GeneratorConfig":
+        """Build a config from 'key=value,key=value' (unknown keys are an error)."""
+        types = {f.name: f.type for f in fields(cls)}
+        kwargs = {}
+        for item in filter(None, (s.strip() for s in spec.split(","))):
+            key, _, value = item.partition("=")
+            if key not in types:
+                raise ValueError(
+                    f"unknown generator option '{key}' (valid: {', '.join(types)})"
+                )
+            kwargs[key] = {"int": int, "float": float}.get(types[key], str)(value)
+        for key in ("services", "endpoints", "cardinality"):
+            if kwargs.get(key, 1) < 1:
+                raise ValueError(f"generator option '{key}' must be at least 1, got {kwargs[key]}")
+        return cls(**kwargs)
+
+
+# ── Templates ──────────────────────────────────────────────────────────────
+
+SPAN_TMPL = (
+    '{"traceId":"%s","spanId":"%s","parentSpanId":"%s","name":"%s","kind":%d,'
+    '"startTimeUnixNano":"%d","endTimeUnixNano":"%d","status":{"code":%d},'
+    '"attributes":[%s]}'
+)
+LOG_TMPL = (
+    '{"timeUnixNano":"%d","observedTimeUnixNano":"%d","severityNumber":%d,'
+    '"severityText":"%s","traceId":"%s","spanId":"%s",'
+    '"body":{"stringValue":"%s"},"attributes":[%s]}'
+)
+GAUGE_TMPL = (
+    '{"name":"%s","unit":"1","gauge":{"dataPoints":[{"timeUnixNano":"%d",'
+    '"asDouble":%.4f,"attributes":[%s]}]}}'
+)
+SUM_TMPL = (
+    '{"name":"%s","unit":"{request}","sum":{"aggregationTemporality":2,'
+    '"isMonotonic":true,"dataPoints":[{"startTimeUnixNano":"%d",'
+    '"timeUnixNano":"%d","asInt":"%d","attributes":[%s]}]}}'
+)
+NGINX_TMPL = (
+    '{"timeUnixNano":"%d","observedTimeUnixNano":"%d","severityNumber":9,'
+    '"severityText":"INFO","body":{"stringValue":"%s %s %s"},"attributes":['
+    '{"key":"remote_addr","value":{"stringValue":"%s"}},'
+    '{"key":"remote_user","value":{"stringValue":"-"}},'
+    '{"key":"request","value":{"stringValue":"%s"}},'
+    '{"key":"status","value":{"stringValue":"%s"}},'
+    '{"key":"body_bytes_sent","value":{"stringValue":"%d"}},'
+    '{"key":"request_time","value":{"stringValue":"%.3f"}},'
+    '{"key":"upstream_response_time","value":{"stringValue":"%.3f"}},'
+    '{"key":"http_referer","value":{"stringValue":"-"}},'
+    '{"key":"http_user_agent","value":{"stringValue":"%s"}},'
+    '{"key":"source","value":{"stringValue":"nginx-demo"}}]}'
+)
+
+
+def _attr(key: str, value: str) -> str:
+    return '{"key":"%s","value":{"stringValue":"%s"}}' % (key, value)
+
+
+def _resource(service: str) -> str:
+    return '{"attributes":[%s,%s]}' % (
+        _attr("service.name", service), _attr("telemetry.sdk.name", "otlp-generator"),
+    )
+
+
+class _Model:
+    """Pre-rendered names and attribute fragments shared by one partition."""
+
+    def __init__(self, cfg: GeneratorConfig):
+        self.services = [f"synthetic-{i:03d}" for i in range(cfg.services)]
+        self.resources = [_resource(s) for s in self.services]
+        self.endpoints = [
+            [f"{HTTP_METHODS[j % len(HTTP_METHODS)]} /api/v1/{s}/r{j:03d}"
+             for j in range(cfg.endpoints)]
+            for s in self.services
+        ]
+        # One pre-rendered fragment per value keeps formatting off the hot path
+        self.user_attrs = [_attr("user.id", f"u{i:07d}") for i in range(cfg.cardinality)]
+        self.extra_attrs = [
+            [_attr(f"app.attr_{k}", f"v{i:05d}") for i in range(cfg.cardinality)]
+            for k in range(cfg.attributes)
+        ]
+        self.remote_addrs = [
+            f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+            for i in range(cfg.cardinality)
+        ]
+        self.duration_ns = _duration_sampler(cfg)
+
+
+def _duration_sampler(cfg: GeneratorConfig):
+    scale_ns = cfg.duration_ms * 1e6
+    if cfg.duration == "lognormal":
+        mu = math.log(scale_ns)
+        return lambda r: int(r.lognormvariate(mu, cfg.sigma))
+    if cfg.duration == "exponential":
+        return lambda r: int(r.expovariate(1.0 / scale_ns))
+    if cfg.duration == "pareto":
+        return lambda r: int(scale_ns * r.paretovariate(cfg.sigma))
+    if cfg.duration == "uniform":
+        return lambda r: int(r.uniform(0, 2 * scale_ns))
+    raise ValueError(f"unknown duration distribution '{cfg.duration}'")
+
+
+def _envelope(key: str, scope_key: str, items_key: str, groups: dict[int, list[str]],
+              resources: list[str]) -> str:
+    """Wrap per-service record fragments in a resource{Spans,Logs,Metrics} payload."""
+    return '{"%s":[%s]}' % (key, ",".join(
+        '{"resource":%s,"%s":[{"scope":{"name":"otlp-generator"},"%s":[%s]}]}'
+        % (resources[svc], scope_key, items_key, ",".join(items))
+        for svc, items in groups.items()
+    ))
+
+
+# ── Partition generators ──────────────────────────────────────────────────
+
+
+def _gen_traces(cfg, model, r, start_ns, end_ns, want_logs, out):
+    """Generate call graphs (and correlated logs) for traces starting in range."""
+    span_groups: dict[int, list[str]] = {}
+    log_groups: dict[int, list[str]] = {}
+    n_spans = n_logs = 0
+    span_batch_ts = log_batch_ts = None
+    n_traces = int((end_ns - start_ns) / 1e9 * cfg.tps)
+    n_extra = len(model.extra_attrs)
+
+    # Sorted starts keep each payload's spans close together in time
+    starts = sorted(start_ns + r.randrange(end_ns - start_ns) for _ in range(n_traces))
+    for trace_start in starts:
+        trace_id = "%032x" % r.getrandbits(128)
+        # Depth-first call graph: (service, parent_span_id, start, level,
+        # max duration or None for the root)
+        stack = [(r.randrange(cfg.services), "", trace_start, 0, None)]
+        while stack:
+            svc, parent_id, span_start, level, max_dur = stack.pop()
+            span_id = "%016x" % r.getrandbits(64)
+            dur = max(1000, model.duration_ns(r))
+            if max_dur is not None:
+                dur = min(dur, max_dur)
+            error = r.random() < cfg.error_rate
+            endpoint = model.endpoints[svc][r.randrange(cfg.endpoints)]
+            attrs = [model.user_attrs[r.randrange(cfg.cardinality)]]
+            for k in range(n_extra):
+                attrs.append(model.extra_attrs[k][r.randrange(cfg.cardinality)])
+            attrs.append(_attr("http.status_code", "500" if error else "200"))
+            span_groups.setdefault(svc, []).append(SPAN_TMPL % (
+                trace_id, span_id, parent_id, endpoint,
+                SPAN_KINDS[level > 0], span_start, span_start + dur,
+                2 if error else 1, ",".join(attrs),
+            ))
+            if span_batch_ts is None or span_start < span_batch_ts:
+                span_batch_ts = span_start
+            n_spans += 1
+
+            if want_logs:
+                n = int(cfg.logs_per_span) + (r.random() < cfg.logs_per_span % 1)
+                for _ in range(n):
+                    ts = span_start + r.randrange(dur)
+                    sev_num, sev = (17, "ERROR") if error else (9, "INFO")
+                    log_groups.setdefault(svc, []).append(LOG_TMPL % (
+                        ts, ts, sev_num, sev, trace_id, span_id,
+                        f"{endpoint} {'failed' if error else 'handled'}",
+                        ",".join(attrs[:2]),
+                    ))
+                    if log_batch_ts is None or ts < log_batch_ts:
+                        log_batch_ts = ts
+                    n_logs += 1
+
+            if level < cfg.depth:
+                for _ in range(r.randrange(cfg.fanout + 1)):
+                    offset = r.randrange(max(1, dur // 2))
+                    stack.append((
+                        r.randrange(cfg.services), span_id, span_start + offset,
+                        level + 1, dur - offset,
+                    ))
+
+        if n_spans >= cfg.batch:
+            out.append(("traces", span_batch_ts, _envelope(
+                "resourceSpans", "scopeSpans", "spans", span_groups, model.resources)))
+            span_groups, n_spans, span_batch_ts = {}, 0, None
+        if n_logs >= cfg.batch:
+            out.append(("logs", log_batch_ts, _envelope(
+                "resourceLogs", "scopeLogs", "logRecords", log_groups, model.resources)))
+            log_groups, n_logs, log_batch_ts = {}, 0, None
+
+    if span_groups:
+        out.append(("traces", span_batch_ts, _envelope(
+            "resourceSpans", "scopeSpans", "spans", span_groups, model.resources)))
+    if log_groups:
+        out.append(("logs", log_batch_ts, _envelope(
+            "resourceLogs", "scopeLogs", "logRecords", log_groups, model.resources)))
+
+
+def _gen_metrics(cfg, model, r, start_ns, end_ns, out):
+    """One gauge and one per-endpoint cumulative sum per service per interval."""
+    step_ns = int(cfg.metric_interval * 1e9)
+    first = start_ns + (-(start_ns - BASE_TIME_NS) % step_ns)
+    for ts in range(first, end_ns, step_ns):
+        groups: dict[int, list[str]] = {}
+        for svc in range(cfg.services):
+            items = groups.setdefault(svc, [])
+            items.append(GAUGE_TMPL % ("synthetic.cpu.utilization", ts, r.random(), ""))
+            elapsed_s = (ts - BASE_TIME_NS) / 1e9
+            for j in range(cfg.endpoints):
+                route = _attr("http.route", model.endpoints[svc][j].split(" ", 1)[1])
+                items.append(SUM_TMPL % (
+                    "synthetic.requests", BASE_TIME_NS, ts,
+                    int(elapsed_s * cfg.tps / cfg.endpoints), route,
+                ))
+        out.append(("metrics", ts, _envelope(
+            "resourceMetrics", "scopeMetrics", "metrics", groups, model.resources)))
+
+
+def _gen_nginx(cfg, model, r, start_ns, end_ns, out):
+    """NGINX records shaped like stream_data.nginx_line_to_log_record() output."""
+    n = int((end_ns - start_ns) / 1e9 * cfg.nginx_rps)
+    stamps = sorted(start_ns + r.randrange(end_ns - start_ns) for _ in range(n))
+    resource = ['{"attributes":[%s]}' % _attr("service.name", "nginx-demo")]
+    for i in range(0, n, cfg.batch):
+        records = []
+        for ts in stamps[i : i + cfg.batch]:
+            svc = r.randrange(cfg.services)
+            request = model.endpoints[svc][r.randrange(cfg.endpoints)] + " HTTP/1.1"
+            status = HTTP_STATUSES[r.randrange(len(HTTP_STATUSES))]
+            size = r.randrange(200, 50_000)
+            upstream = model.duration_ns(r) / 1e9
+            records.append(NGINX_TMPL % (
+                ts, ts, request, status, size,
+                model.remote_addrs[r.randrange(cfg.cardinality)], request, status, size,
+                upstream + 0.001, upstream, USER_AGENTS[r.randrange(len(USER_AGENTS))],
+            ))
+        out.append(("nginx", stamps[i], _envelope(
+            "resourceLogs", "scopeLogs", "logRecords", {0: records}, resource)))
+
+
+def _generate_partition(
+    cfg: GeneratorConfig, signals: frozenset[str], part: int,
+) -> list[tuple[str, int, str]]:
+    """Pool worker: generate one PARTITION_SECONDS slice of the timeline."""
+    r = random.Random(cfg.seed * 1_000_003 + part)
+    model = _Model(cfg)
+    start_ns = BASE_TIME_NS + part * PARTITION_SECONDS * 10**9
+    end_ns = BASE_TIME_NS + int(min(cfg.seconds, (part + 1) * PARTITION_SECONDS) * 1e9)
+    out: list[tuple[str, int, str]] = []
+    if "traces" in signals or "logs" in signals:
+        traces: list[tuple[str, int, str]] = []
+        _gen_traces(cfg, model, r, start_ns, end_ns, "logs" in signals, traces)
+        out.extend(b for b in traces if b[0] in signals)
+    if "metrics" in signals:
+        _gen_metrics(cfg, model, r, start_ns, end_ns, out)
+    if "nginx" in signals:
+        _gen_nginx(cfg, model, r, start_ns, end_ns, out)
+    return out
+
+
+def generate_batches(
+    cfg: GeneratorConfig, signals: set[str], workers: int | None = None,
+) -> list[tuple[str, int, str]]:
+    """Generate raw (signal_type, ts_ns, payload) tuples for the selected signals."""
+    workers = workers or os.cpu_count() or 1
+    parts = range(max(1, math.ceil(cfg.seconds / PARTITION_SECONDS)))
+    frozen = frozenset(signals)
+    raw: list[tuple[str, int, str]] = []
+    if workers == 1 or len(parts) == 1:
+        for part in parts:
+            raw.extend(_generate_partition(cfg, frozen, part))
+        return raw
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in pool.map(
+            _generate_partition, [cfg] * len(parts), [frozen] * len(parts), parts,
+        ):
+            raw.extend(batch)
+    return raw
+
+
+def count_records(signal_type: str, payload: str) -> int:
+    """Count spans / log records / data points in a generated payload."""
+    if signal_type == "traces":
+        return payload.count('"spanId":"')
+    if signal_type == "metrics":
+        return payload.count('"timeUnixNano"')
+    return payload.count('"observedTimeUnixNano"')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic OTLP data")
+    parser.add_argument(
+        "--spec", default="",
+        help="Generator options as key=value,... (e.g. services=100,tps=1000)",
+    )
+    parser.add_argument(
+        "--signals", default="traces,logs,metrics,nginx",
+        help="Comma-separated signals to generate",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Generator processes")
+    parser.add_argument("--out", help="Write <signal>.json NDJSON files to this directory")
+    parser.add_argument("--bench", action="store_true", help="Report generation rate")
+    args = parser.parse_args()
+
+    cfg = GeneratorConfig.from_spec(args.spec)
+    signals = set(args.signals.split(","))
+
+    start = time.perf_counter()
+    raw = generate_batches(cfg, signals, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.bench or not args.out:
+        totals: dict[str, int] = {}
+        size = 0
+        for sig, _, payload in raw:
+            totals[sig] = totals.get(sig, 0) + count_records(sig, payload)
+            size += len(payload)
+        records = sum(totals.values())
+        print(
+            f"Generated {records:,} records in {len(raw):,} payloads "
+            f"({size / 1e6:.1f} MB) in {elapsed:.2f}s "
+            f"= {records / elapsed:,.0f} records/s"
+        )
+        for sig, n in sorted(totals.items()):
+            print(f"  {sig:<8} {n:>12,}")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        handles = {}
+        try:
+            # nginx payloads are OTLP logs already; keep them in their own file
+            for sig, _, payload in sorted(raw, key=lambda b: b[1]):
+                if sig not in handles:
+                    handles[sig] = open(os.path.join(args.out, f"{sig}.json"), "w")
+                handles[sig].write(payload + "\n")
+        finally:
+            for fh in handles.values():
+                fh.close()
+        print(f"Wrote {', '.join(sorted(handles))} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
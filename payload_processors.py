@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Attribute filtering and payload slimming for stream_data.py --process.
+
+AttributeProcessor edits parsed OTLP JSON once, when batches are prepared.
+It visits every attribute list: resource, scope, span, event, link, log
+record and data point. It can:
+
+    drop=PATTERN,...     remove attributes whose key matches a glob (e.g. telemetry.sdk.*)
+    hash=PATTERN,...     replace matching string values with a 16-hex-char digest
+    truncate=N           cut log bodies longer than N characters
+    max-value=N          cut any other string attribute value longer than N
+    numeric              send integer strings as intValue (decimals stay strings, so
+                         values like "0.010" are stored unchanged)
+
+service.name is never dropped or hashed. Options are separated by ';', e.g.
+"drop=process.command_args,telemetry.sdk.*;hash=session.id;truncate=256;numeric".
+
+Usage:
+    python payload_processors.py --spec "drop=telemetry.*;numeric"                # Size before/after
+    python payload_processors.py --spec "truncate=128" --post http://localhost:4318 --seconds 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROTECTED_KEYS = {"service.name"}
+# Canonical integers only (no leading zeros, no "-0"): their text survives
+# the intValue round trip exactly
+INT_RE = re.compile(r"^(0|-?[1-9]\d{0,17})$")
+
+
+def _patterns(value: str) -> list[str]:
+    return [p.strip() for p in value.split(",") if p.strip()]
+
+
+class AttributeProcessor:
+    """Payload stage that drops, hashes, truncates and types attributes."""
+
+    name = "attributes"
+
+    def __init__(self, drop: list[str] | None = None, hash_keys: list[str] | None = None,
+                 truncate: int | None = None, max_value: int | None = None,
+                 numeric: bool = False):
+        self.drop = drop or []
+        self.hash_keys = hash_keys or []
+        self.truncate = truncate
+        self.max_value = max_value
+        self.numeric = numeric
+        self.counts: dict[str, int] = defaultdict(int)
+        self._key_actions: dict[str, str | None] = {}
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "AttributeProcessor":
+        kwargs: dict = {}
+        for item in filter(None, (s.strip() for s in spec.split(";"))):
+            key, _, value = item.partition("=")
+            if key == "drop":
+                kwargs["drop"] = _patterns(value)
+            elif key == "hash":
+                kwargs["hash_keys"] = _patterns(value)
+            elif key in ("truncate", "max-value"):
+                try:
+                    kwargs[key.replace("-", "_")] = int(value)
+                except ValueError:
+                    raise ValueError(f"{key}: expected an integer, got {value!r}") from None
+            elif key == "numeric":
+                kwargs["numeric"] = True
+            else:
+                raise ValueError(f"unknown option '{key}' (drop, hash, truncate, max-value, numeric)")
+        return cls(**kwargs)
+
+    def _action(self, key: str) -> str | None:
+        # Keys repeat constantly; cache the glob matching per key
+        if key not in self._key_actions:
+            action = None
+            if key not in PROTECTED_KEYS:
+                if any(fnmatch.fnmatchcase(key, p) for p in self.drop):
+                    action = "drop"
+                elif any(fnmatch.fnmatchcase(key, p) for p in self.hash_keys):
+                    action = "hash"
+            self._key_actions[key] = action
+        return self._key_actions[key]
+
+    def process_attributes(self, attributes: list[dict]) -> list[dict]:
+        out = []
+        for attr in attributes:
+            action = self._action(attr.get("key", ""))
+            if action == "drop":
+                self.counts["dropped"] += 1
+                continue
+            value = attr.get("value", {})
+            text = value.get("stringValue")
+            if isinstance(text, str):
+                if action == "hash":
+                    value["stringValue"] = hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+                    self.counts["hashed"] += 1
+                elif self.numeric and INT_RE.match(text):
+                    attr["value"] = {"intValue": text}
+                    self.counts["typed"] += 1
+                elif self.max_value is not None and len(text) > self.max_value:
+                    value["stringValue"] = text[:self.max_value]
+                    self.counts["values truncated"] += 1
+            out.append(attr)
+        return out
+
+    def process_log_record(self, record: dict):
+        """Apply the processor to one logRecord (used by --nginx-follow)."""
+        self._walk(record)
+
+    def _walk(self, node):
+        if isinstance(node, dict):
+            for key, child in node.items():
+                if key == "attributes" and isinstance(child, list):
+                    node[key] = self.process_attributes(child)
+                elif key == "body" and self.truncate is not None and isinstance(child, dict):
+                    text = child.get("stringValue")
+                    if isinstance(text, str) and len(text) > self.truncate:
+                        child["stringValue"] = text[:self.truncate]
+                        self.counts["bodies truncated"] += 1
+                elif isinstance(child, (dict, list)):
+                    self._walk(child)
+        elif isinstance(node, list):
+            for child in node:
+                self._walk(child)
+
+    def process(self, signal_type: str, data: dict) -> bool:
+        self._walk(data)
+        return True
+
+    def report(self) -> str:
+        if not self.counts:
+            return "Attributes: nothing changed"
+        return "Attributes: " + ", ".join(f"{n:,} {what}" for what, n in sorted(self.counts.items()))
+
+
+# ── Benchmark ─────────────────────────────────────────────────────────────
+
+
+def _post_for(session: requests.Session, endpoint: str, batches,
+              seconds: float) -> tuple[int, int, int, float]:
+    """POST batches round-robin for `seconds`; returns (ok requests, ok bytes, failures, elapsed)."""
+    from stream_data import SIGNAL_ENDPOINT
+
+    sent = ok = nbytes = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        signal_type, _, payload = batches[sent % len(batches)]
+        sent += 1
+        try:
+            r = session.post(f"{endpoint}/v1/{SIGNAL_ENDPOINT[signal_type]}", data=payload, timeout=10)
+        except requests.RequestException:
+            continue
+        if 200 <= r.status_code < 300:
+            ok += 1
+            nbytes += len(payload)
+    return ok, nbytes, sent - ok, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure attribute processors on sample data")
+    parser.add_argument("--spec", required=True, help="Processor options (see module docstring)")
+    parser.add_argument("--input", default="sample.tar.gz", help="Input for stream_data.load_batches")
+    parser.add_argument("--nginx", default="access.log", help="NGINX access log (skipped if missing)")
+    parser.add_argument("--post", metavar="OTLP_URL", help="Also measure ingest throughput against this endpoint")
+    parser.add_argument("--seconds", type=float, default=10.0, help="--post: seconds per variant")
+    args = parser.parse_args()
+
+    from stream_data import apply_payload_stages, load_batches, load_nginx_batches
+
+    try:
+        processor = AttributeProcessor.from_spec(args.spec)
+    except ValueError as e:
+        sys.exit(f"--spec: {e}")
+
+    raw = load_batches(args.input, {"traces", "logs", "metrics"})
+    if os.path.exists(args.nginx):
+        raw.extend(load_nginx_batches(args.nginx))
+    # Baseline: the same re-serialization with no stage, so only the processor differs
+    before, _ = apply_payload_stages(raw, [])
+    start = time.perf_counter()
+    after, _ = apply_payload_stages(raw, [processor])
+    elapsed = time.perf_counter() - start
+
+    sizes: dict[str, list[int]] = defaultdict(lambda: [0, 0, 0])
+    for (sig, _, p0), (_, _, p1) in zip(before, after):
+        sizes[sig][0] += 1
+        sizes[sig][1] += len(p0)
+        sizes[sig][2] += len(p1)
+    print(f"Processed {len(raw)} batches in {elapsed:.1f}s. {processor.report()}")
+    print(f"  {'signal':<8} {'avg req before':>15} {'avg req after':>14} {'saved':>7}")
+    for sig, (n, b0, b1) in sizes.items():
+        print(f"  {sig:<8} {b0 / n:>13,.0f} B {b1 / n:>12,.0f} B {(1 - b1 / b0) * 100:>6.1f}%")
+
+    if args.post:
+        session = requests.Session()
+        session.headers.update({
+            "Content-Type": "application/json",
+            "authorization": os.getenv("HYPERDX_API_KEY", ""),
+        })
+        print(f"\nIngest throughput against {args.post} ({args.seconds:g}s each)")
+        for label, batches in (("before", before), ("after", after)):
+            n, nbytes, failed, secs = _post_for(session, args.post.rstrip("/"), batches, args.seconds)
+            fail_str = f" ({failed} failed, not counted)" if failed else ""
+            print(f"  {label:<7} {n / secs:>8.1f} req/s {nbytes / secs / 1e6:>8.2f} MB/s{fail_str}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Per-stage profiling for stream_data.py --profile.
+
+StageProfiler wraps the functions that make up each pipeline stage (tar
+decompression, timestamp extraction, sorting, payload stages, JSON
+building, timestamp rewriting, HTTP POST) with counting timers. Nothing
+is wrapped unless --profile is given, so normal runs pay no overhead.
+
+Modes (comma-separated, e.g. --profile alloc,cprofile):
+    stages     wall time, calls and bytes handled per stage (always on)
+    alloc      count allocations with tracemalloc: retained bytes per stage, and
+               peak bytes for outermost stages; main thread only (see below)
+    cprofile   run one cProfile session covering the stream threads; save PREFIX.prof
+
+At exit the breakdown is printed and written to PREFIX.json. Timings
+cover work done in this process; with --workers > 1 timestamp extraction
+runs in pool workers and only the load wall time is attributed here.
+
+tracemalloc's counters are process-wide and its peak can only be reset
+globally, so allocations are attributed only to stages on the main thread
+(loading and preparation), and peaks only to the outermost of nested
+stages. Stages on stream threads show "-"; use cprofile for those.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+MODES = ("stages", "alloc", "cprofile")
+
+# From 3.12 cProfile is built on sys.monitoring: one profiler sees every
+# thread, and a second one cannot be enabled while it runs
+PROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def parse_profile_modes(spec: str) -> set[str]:
+    modes = {m.strip() for m in spec.split(",") if m.strip()} | {"stages"}
+    unknown = modes - set(MODES)
+    if unknown:
+        raise ValueError(f"unknown mode(s) {', '.join(sorted(unknown))} ({', '.join(MODES)})")
+    return modes
+
+
+class StageStats:
+    __slots__ = ("calls", "seconds", "bytes", "alloc_peak", "alloc_retained")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.alloc_peak: int | None = None
+        self.alloc_retained: int | None = None
+
+
+class StageProfiler:
+    """Accumulates time, calls, bytes and allocations per named stage."""
+
+    def __init__(self, modes: set[str], prefix: str = "stream_profile"):
+        self.modes = modes
+        self.prefix = prefix
+        self.stages: dict[str, StageStats] = {}
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.thread_profiles: list[cProfile.Profile] = []
+        self.main_profile = None
+        # Nesting depth of timed stages on the main thread
+        self._depth = 0
+        if "alloc" in modes:
+            tracemalloc.start()
+        if "cprofile" in modes:
+            self.main_profile = cProfile.Profile()
+            self.main_profile.enable()
+
+    def _add(self, name: str, seconds: float, nbytes: int,
+             peak: int | None = None, retained: int | None = None):
+        with self.lock:
+            st = self.stages.get(name)
+            if st is None:
+                st = self.stages[name] = StageStats()
+            st.calls += 1
+            st.seconds += seconds
+            st.bytes += nbytes
+            if peak is not None:
+                st.alloc_peak = max(st.alloc_peak or 0, peak)
+            if retained is not None:
+                st.alloc_retained = (st.alloc_retained or 0) + retained
+
+    def wrap(self, name: str, fn, size=None):
+        """Time every call of fn as stage `name`; size(args, kwargs, result) -> bytes."""
+        trace = "alloc" in self.modes
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            measure = trace and threading.current_thread() is threading.main_thread()
+            if measure:
+                outermost = self._depth == 0
+                self._depth += 1
+                if outermost:
+                    tracemalloc.reset_peak()
+                mem_before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                if measure:
+                    self._depth -= 1
+            peak = retained = None
+            if measure:
+                current, peak_abs = tracemalloc.get_traced_memory()
+                retained = current - mem_before
+                if outermost:
+                    peak = peak_abs - mem_before
+            self._add(name, elapsed, size(args, kwargs, result) if size else 0, peak, retained)
+            return result
+        return timed
+
+    def wrap_iter(self, name: str, fn, size=None):
+        """Like wrap() for a generator function: times each step; size(item) -> bytes."""
+        item_size = (lambda args, kwargs, item: 0 if item is StopIteration else size(item)) if size else None
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            it = iter(fn(*args, **kwargs))
+            step = self.wrap(name, lambda: next(it, StopIteration), item_size)
+            while True:
+                item = step()
+                if item is StopIteration:
+                    return
+                yield item
+        return timed
+
+    def instrument(self, module, attr: str, name: str, size=None, generator: bool = False):
+        """Replace module.attr with a timed wrapper, so callers that look it up are counted."""
+        fn = getattr(module, attr)
+        setattr(module, attr, (self.wrap_iter if generator else self.wrap)(name, fn, size))
+
+    def thread_target(self, target):
+        """Wrap a thread target so cProfile also sees work done in that thread.
+
+        Only needed before 3.12, where a profiler covers one thread; the
+        session profiler already sees every thread on 3.12+.
+        """
+        if self.main_profile is None or PROFILE_ALL_THREADS:
+            return target
+
+        @functools.wraps(target)
+        def profiled(*args, **kwargs):
+            prof = cProfile.Profile()
+            with self.lock:
+                self.thread_profiles.append(prof)
+            prof.runcall(target, *args, **kwargs)
+        return profiled
+
+    def report(self) -> str:
+        total = time.perf_counter() - self.started
+        trace = "alloc" in self.modes
+        header = (
+            f"  {'stage':<22} {'calls':>9} {'seconds':>9} {'% wall':>7} {'us/call':>9} "
+            f"{'MB':>9} {'MB/s':>8}"
+        )
+        if trace:
+            header += f" {'peak KiB':>9} {'kept KiB':>9}"
+        lines = [f"Stage profile ({total:.1f}s wall; stages in stream threads overlap):", header]
+        with self.lock:
+            items = sorted(self.stages.items(), key=lambda kv: -kv[1].seconds)
+        for name, st in items:
+            mb = st.bytes / 1e6
+            line = (
+                f"  {name:<22} {st.calls:>9,} {st.seconds:>9.2f} {st.seconds / total * 100:>6.1f}% "
+                f"{st.seconds / st.calls * 1e6:>9.1f} {mb:>9.1f} "
+                f"{mb / st.seconds if st.seconds else 0:>8.1f}"
+            )
+            if trace:
+                line += "".join(
+                    f" {'-':>9}" if v is None else f" {v / 1024:>9.0f}"
+                    for v in (st.alloc_peak, st.alloc_retained)
+                )
+            lines.append(line)
+        return "\n".join(lines)
+
+    def finish(self):
+        """Stop profilers, print the breakdown and write PREFIX.json (and .prof)."""
+        total = time.perf_counter() - self.started
+        print("\n" + self.report())
+        breakdown = {
+            "wall_seconds": total,
+            "modes": sorted(self.modes),
+            "stages": {name: {k: getattr(st, k) for k in StageStats.__slots__}
+                       for name, st in self.stages.items()},
+        }
+        with open(f"{self.prefix}.json", "w", encoding="utf-8") as f:
+            json.dump(breakdown, f, indent=2)
+        written = [f"{self.prefix}.json"]
+        if self.main_profile is not None:
+            self.main_profile.disable()
+            stats = pstats.Stats(self.main_profile, stream=io.StringIO())
+            for prof in self.thread_profiles:
+                stats.add(prof)
+            stats.dump_stats(f"{self.prefix}.prof")
+            written.append(f"{self.prefix}.prof")
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(20)
+            print(out.getvalue().rstrip())
+        if "alloc" in self.modes:
+            tracemalloc.stop()
+        print(f"Profile written to {', '.join(written)}")
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Caching HTTP proxy for the ClickHouse HTTP interface (port 8123).
+
+Sits between dashboards and ClickHouse so that a refresh storm — many viewers
+of the same dashboard firing identical tile queries — costs ClickHouse one
+query per tile per time bucket:
+
+  - Normalization: time-range literals (fromUnixTimestamp64Milli(...),
+    toDateTime(...), toDateTime64(...)) are floored to --bucket seconds, so
+    viewers that opened the dashboard a few seconds apart send the same query.
+  - LRU cache with a TTL and a byte budget for read-only queries.
+  - In-flight coalescing: concurrent identical misses wait for one upstream
+    query instead of each sending their own.
+  - GET /proxy/stats returns hit/miss/coalesced counts and latency percentiles.
+
+Usage:
+    python query_proxy.py                           # Listen on :8124 -> CLICKHOUSE_URL
+    python query_proxy.py --port 9000 --ttl 30 --bucket 15 --max-mb 256
+    python query_proxy.py --bench                   # Benchmark against a local stand-in
+    curl -s "http://localhost:8124/?user=api&password=api" --data "SELECT 1"
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from dotenv import load_dotenv
+
+from clickhouse_http import percentile
+
+load_dotenv()
+
+# Only queries starting with these keywords are cached
+CACHEABLE_RE = re.compile(r"^\s*(SELECT|WITH|SHOW|DESCRIBE|DESC|EXISTS)\b", re.IGNORECASE)
+
+# Request parameters that never change the result
+IGNORED_PARAMS = {"query", "query_id", "session_id", "session_check", "session_timeout"}
+
+# Request headers forwarded upstream; they pick the user/database, so they
+# are also part of the cache key
+FORWARD_HEADERS = ("Authorization", "X-ClickHouse-User", "X-ClickHouse-Key", "X-ClickHouse-Database")
+
+# Response headers worth relaying (transfer encoding is re-done by this server)
+RELAY_HEADERS = ("Content-Type", "X-ClickHouse-Format", "X-ClickHouse-Timezone")
+
+# Whitespace outside of quoted string literals
+WHITESPACE_RE = re.compile(r"('(?:[^'\\]|\\.)*')|\s+")
+
+EPOCH_FUNC_RE = re.compile(
+    r"\b(fromUnixTimestamp64(Milli|Micro|Nano)|toDateTime64|toDateTime)\(\s*(\d+(?:\.\d+)?)"
+)
+DATETIME_LITERAL_RE = re.compile(
+    r"\b(toDateTime64|toDateTime|parseDateTimeBestEffort)\(\s*'(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d)"
+    r"(?:\.\d+)?'"
+)
+
+EPOCH_UNITS = {"Milli": 10**3, "Micro": 10**6, "Nano": 10**9}
+
+
+def align_time_literals(sql: str, bucket_s: int) -> str:
+    """Floor epoch and datetime literals in time-range functions to bucket_s."""
+    if bucket_s <= 0:
+        return sql
+
+    def epoch(m: re.Match) -> str:
+        scale = EPOCH_UNITS.get(m.group(2), 1)
+        value = float(m.group(3)) if "." in m.group(3) else int(m.group(3))
+        bucket = bucket_s * scale
+        return f"{m.group(1)}({int(value // bucket * bucket)}"
+
+    def literal(m: re.Match) -> str:
+        dt = datetime.strptime(m.group(2).replace("T", " "), "%Y-%m-%d %H:%M:%S")
+        ts = int(dt.replace(tzinfo=timezone.utc).timestamp())
+        floored = datetime.fromtimestamp(ts - ts % bucket_s, tz=timezone.utc)
+        return f"{m.group(1)}('{floored.strftime('%Y-%m-%d %H:%M:%S')}'"
+
+    return DATETIME_LITERAL_RE.sub(literal, EPOCH_FUNC_RE.sub(epoch, sql))
+
+
+def normalize_query(sql: str, bucket_s: int) -> tuple[str, str]:
+    """Return (query to send upstream, cache key text).
+
+    The upstream query only has its time literals aligned; the key also
+    collapses insignificant whitespace.
+    """
+    aligned = align_time_literals(sql, bucket_s)
+    key_text = WHITESPACE_RE.sub(lambda m: m.group(1) or " ", aligned).strip().rstrip(";")
+    return aligned, key_text
+
+
+class CachedResponse:
+    __slots__ = ("status", "headers", "body", "expires")
+
+    def __init__(self, status: int, headers: dict[str, str], body: bytes, expires: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+
+
+class _InFlight:
+    __slots__ = ("done", "response", "error", "error_status")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: CachedResponse | None = None
+        self.error: str | None = None
+        self.error_status = 502
+
+
+class QueryCache:
+    """LRU response cache with TTL, byte budget and in-flight coalescing."""
+
+    def __init__(self, ttl_s: float, max_bytes: int, max_entry_bytes: int):
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.inflight: dict[str, _InFlight] = {}
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {
+            "hits": 0, "misses": 0, "coalesced": 0, "passthrough": 0,
+            "upstream_errors": 0, "evictions": 0, "expired": 0, "uncacheable_size": 0,
+        }
+        self.latency_ms = {
+            "hit": deque(maxlen=10_000),
+            "miss": deque(maxlen=10_000),
+            "coalesced": deque(maxlen=10_000),
+            "passthrough": deque(maxlen=10_000),
+        }
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self.bytes -= len(entry.body)
+
+    def get_or_join(self, key: str) -> tuple[CachedResponse | None, _InFlight, bool]:
+        """Return (cached, inflight, is_leader).
+
+        On a hit, cached is set. Otherwise the caller either leads the upstream
+        query (is_leader) and must call complete(), or waits on inflight.done.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry.expires > time.time():
+                    self.entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry, None, False
+                self._remove(key)
+                self.stats["expired"] += 1
+            flight = self.inflight.get(key)
+            if flight is not None:
+                self.stats["coalesced"] += 1
+                return None, flight, False
+            flight = self.inflight[key] = _InFlight()
+            self.stats["misses"] += 1
+            return None, flight, True
+
+    def complete(self, key: str, flight: _InFlight, response: CachedResponse | None,
+                 error: str | None = None, error_status: int = 502):
+        """Publish the leader's result to waiters and cache it if successful."""
+        with self.lock:
+            del self.inflight[key]
+            if response is not None and response.status == 200:
+                size = len(response.body)
+                if size > self.max_entry_bytes:
+                    self.stats["uncacheable_size"] += 1
+                else:
+                    if key in self.entries:
+                        self._remove(key)
+                    self.entries[key] = response
+                    self.bytes += size
+                    while self.bytes > self.max_bytes and self.entries:
+                        self._remove(next(iter(self.entries)))
+                        self.stats["evictions"] += 1
+            elif error is not None or response is None or response.status >= 500:
+                self.stats["upstream_errors"] += 1
+        flight.response = response
+        flight.error = error
+        flight.error_status = error_status
+        flight.done.set()
+
+    def record(self, kind: str, elapsed_ms: float):
+        with self.lock:
+            self.latency_ms[kind].append(elapsed_ms)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            latency = {}
+            for kind, samples in self.latency_ms.items():
+                ordered = sorted(samples)
+                if ordered:
+                    latency[kind] = {
+                        "count": len(ordered),
+                        "p50_ms": round(percentile(ordered, 50), 2),
+                        "p95_ms": round(percentile(ordered, 95), 2),
+                        "p99_ms": round(percentile(ordered, 99), 2),
+                    }
+            return {
+                **self.stats,
+                "hit_ratio": round(
+                    (self.stats["hits"] + self.stats["coalesced"]) / lookups, 4,
+                ) if lookups else 0.0,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "inflight": len(self.inflight),
+                "latency": latency,
+            }
+
+
+def make_handler(upstream: str, cache: QueryCache, bucket_s: int, timeout: float):
+    """Build a request handler class bound to one upstream and cache."""
+    local = threading.local()
+
+    def session() -> requests.Session:
+        # One pooled session per server thread
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    class QueryProxyHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, headers: dict[str, str], body: bytes, cache_state: str):
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Proxy-Cache", cache_state)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _upstream(self, method: str, params: list[tuple[str, str]],
+                      body: bytes | None) -> CachedResponse:
+            headers = {h: self.headers[h] for h in FORWARD_HEADERS if h in self.headers}
+            headers["Accept-Encoding"] = "identity"
+            r = session().request(
+                method, f"{upstream}{urlsplit(self.path).path}", params=params, data=body,
+                headers=headers, timeout=timeout,
+            )
+            headers = {h: r.headers[h] for h in RELAY_HEADERS if h in r.headers}
+            return CachedResponse(r.status_code, headers, r.content, time.time() + cache.ttl_s)
+
+        def do_GET(self):
+            if urlsplit(self.path).path == "/proxy/stats":
+                body = json.dumps(cache.snapshot(), indent=2).encode()
+                self._send(200, {"Content-Type": "application/json"}, body, "STATS")
+                return
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def _handle(self, method: str):
+            start = time.perf_counter()
+            params = parse_qsl(urlsplit(self.path).query, keep_blank_values=True)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+
+            # ClickHouse concatenates the `query` parameter and the body
+            query_param = next((v for k, v in params if k == "query"), "")
+            sql = "\n".join(p for p in (query_param, body.decode("utf-8", "replace")) if p)
+
+            if not CACHEABLE_RE.match(sql):
+                try:
+                    resp = self._upstream(method, params, body or None)
+                except requests.RequestException as e:
+                    self._send(502, {}, f"upstream error: {e}".encode(), "ERROR")
+                    return
+                with cache.lock:
+                    cache.stats["passthrough"] += 1
+                self._send(resp.status, resp.headers, resp.body, "BYPASS")
+                cache.record("passthrough", (time.perf_counter() - start) * 1000)
+                return
+
+            upstream_sql, key_text = normalize_query(sql, bucket_s)
+            key_params = sorted((k, v) for k, v in params if k not in IGNORED_PARAMS)
+            # Credentials in headers identify the user just like ?user=&password=
+            identity = [(h, self.headers[h]) for h in FORWARD_HEADERS if h in self.headers]
+            key = hashlib.sha256(
+                json.dumps([key_text, key_params, identity]).encode("utf-8")
+            ).hexdigest()
+
+            cached, flight, leader = cache.get_or_join(key)
+            if cached is not None:
+                self._send(cached.status, cached.headers, cached.body, "HIT")
+                cache.record("hit", (time.perf_counter() - start) * 1000)
+                return
+
+            if leader:
+                forward = [(k, v) for k, v in params if k != "query"]
+                try:
+                    resp = self._upstream("POST", forward, upstream_sql.encode("utf-8"))
+                    cache.complete(key, flight, resp)
+                except requests.Timeout:
+                    cache.complete(
+                        key, flight, None, error=f"timed out after {timeout:g}s",
+                        error_status=504,
+                    )
+                except Exception as e:  # waiters must always be released
+                    cache.complete(key, flight, None, error=str(e))
+                state, kind = "MISS", "miss"
+            else:
+                if not flight.done.wait(timeout):
+                    self._send(
+                        504, {}, f"timed out after {timeout:g}s waiting for an identical "
+                        "in-flight query".encode(), "ERROR",
+                    )
+                    return
+                state, kind = "COALESCED", "coalesced"
+
+            if flight.response is None:
+                self._send(flight.error_status, {}, f"upstream error: {flight.error}".encode(), "ERROR")
+                return
+            resp = flight.response
+            self._send(resp.status, resp.headers, resp.body, state)
+            cache.record(kind, (time.perf_counter() - start) * 1000)
+
+    return QueryProxyHandler
+
+
+def serve(host: str, port: int, upstream: str, cache: QueryCache, bucket_s: int,
+          timeout: float = 60.0) -> ThreadingHTTPServer:
+    """Create (but do not start) a proxy server."""
+    handler = make_handler(upstream.rstrip("/"), cache, bucket_s, timeout)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# ── Benchmark ─────────────────────────────────────────────────────────────
+
+
+def _stand_in_clickhouse(delay_s: float) -> ThreadingHTTPServer:
+    """Local fake ClickHouse: answers every query after delay_s with a small result."""
+    counter = {"queries": 0}
+    lock = threading.Lock()
+
+    class StandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            sql = self.rfile.read(length)
+            with lock:
+                counter["queries"] += 1
+            time.sleep(delay_s)
+            digest = hashlib.md5(sql).hexdigest()
+            body = "".join(
+                json.dumps({"ts": i, "series": digest[:8], "value": i * 1.5}) + "\n"
+                for i in range(60)
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.daemon_threads = True
+    server.counter = counter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+BENCH_TILE_SQL = (
+    "SELECT toStartOfInterval(Timestamp, INTERVAL 1 minute) AS ts, count() AS value "
+    "FROM otel_traces WHERE ServiceName = 'svc-{tile}' "
+    "AND Timestamp >= fromUnixTimestamp64Milli({start_ms}) "
+    "AND Timestamp <= fromUnixTimestamp64Milli({end_ms}) GROUP BY ts ORDER BY ts"
+)
+
+
+def _bench_run(url: str, viewers: int, refreshes: int, tiles: int) -> tuple[float, list[float]]:
+    """viewers x refreshes dashboard loads of `tiles` tiles; returns (seconds, latencies)."""
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def viewer(v: int):
+        s = requests.Session()
+        for _ in range(refreshes):
+            # "Last 1 hour" relative to each viewer's own clock
+            end_ms = int(time.time() * 1000) + v
+            for tile in range(tiles):
+                sql = BENCH_TILE_SQL.format(tile=tile, start_ms=end_ms - 3_600_000, end_ms=end_ms)
+                t0 = time.perf_counter()
+                s.post(url, data=sql, timeout=30).raise_for_status()
+                with lock:
+                    latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=viewers) as pool:
+        list(pool.map(viewer, range(viewers)))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def benchmark(args):
+    upstream = _stand_in_clickhouse(args.bench_delay / 1000)
+    upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}"
+    cache = QueryCache(args.ttl, int(args.max_mb * 1024 * 1024), int(args.max_entry_mb * 1024 * 1024))
+    proxy = serve("127.0.0.1", 0, upstream_url, cache, args.bucket)
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+    proxy_url = f"http://127.0.0.1:{proxy.server_address[1]}/"
+
+    print(
+        f"Benchmark: {args.bench_viewers} viewers x {args.bench_refreshes} refreshes x "
+        f"{args.bench_tiles} tiles, stand-in ClickHouse latency {args.bench_delay:.0f} ms"
+    )
+    print(f"  {'target':<8} {'seconds':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'upstream q':>11}")
+    for name, url in (("direct", upstream_url + "/"), ("proxy", proxy_url)):
+        before = upstream.counter["queries"]
+        elapsed, lat = _bench_run(url, args.bench_viewers, args.bench_refreshes, args.bench_tiles)
+        print(
+            f"  {name:<8} {elapsed:>8.2f} {len(lat) / elapsed:>8.0f} "
+            f"{percentile(lat, 50):>8.1f} {percentile(lat, 95):>8.1f} "
+            f"{upstream.counter['queries'] - before:>11}"
+        )
+    stats = cache.snapshot()
+    print(
+        f"  proxy cache: {stats['hits']} hits, {stats['coalesced']} coalesced, "
+        f"{stats['misses']} misses (hit ratio {stats['hit_ratio']:.1%})"
+    )
+    proxy.shutdown()
+    upstream.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caching proxy for the ClickHouse HTTP interface")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8124, help="Listen port (default: 8124)")
+    parser.add_argument(
+        "--upstream", default=os.getenv("CLICKHOUSE_URL", "http://localhost:8123"),
+        help="ClickHouse HTTP URL (default: $CLICKHOUSE_URL or http://localhost:8123)",
+    )
+    parser.add_argument("--ttl", type=float, default=30.0, help="Cache entry TTL in seconds")
+    parser.add_argument(
+        "--bucket", type=int, default=10,
+        help="Floor time-range literals to this many seconds (0 = off)",
+    )
+    parser.add_argument("--max-mb", type=float, default=128, help="Cache size budget in MiB")
+    parser.add_argument(
+        "--max-entry-mb", type=float, default=8, help="Largest single response to cache (MiB)",
+    )
+    parser.add_argument("--bench", action="store_true", help="Benchmark against a local stand-in")
+    parser.add_argument("--bench-viewers", type=int, default=20)
+    parser.add_argument("--bench-refreshes", type=int, default=5)
+    parser.add_argument("--bench-tiles", type=int, default=8)
+    parser.add_argument(
+        "--bench-delay", type=float, default=50, help="Stand-in query latency in ms",
+    )
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args)
+        return
+
+    cache = QueryCache(args.ttl, int(args.max_mb * 1024 * 1024), int(args.max_entry_mb * 1024 * 1024))
+    try:
+        server = serve(args.host, args.port, args.upstream, cache, args.bucket)
+    except OSError as e:
+        print(f"  ERROR: cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(
+        f"Proxying http://{args.host}:{args.port} -> {args.upstream} "
+        f"(ttl {args.ttl:g}s, bucket {args.bucket}s, {args.max_mb:g} MiB)"
+    )
+    print(f"Stats: http://{args.host}:{args.port}/proxy/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(cache.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
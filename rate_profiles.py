@@ -0,0 +1,120 @@
+"""
+Traffic-shaping rate profiles for stream_data.py --rate-profile.
+
+A profile is a relative send rate r(t) over the wall-clock seconds of one
+cycle. build_time_warp() turns it into a monotonic mapping from a batch's
+position in the recorded timeline to its send offset within the cycle, so
+batches bunch up where r(t) is high and thin out where it is low. Because
+timestamps are rewritten to the send offset, the data stays time-coherent:
+a 5x burst in send rate shows up as a 5x burst in ClickHouse.
+
+Profile specs:
+    flat                              constant rate (default)
+    diurnal[:periods=1,floor=0.2]     sine curve between floor and 1
+    step:1,2,4,8                      equal-length steps at these rates
+    burst[:x=5,every=60,width=10]     x times traffic for `width` s every `every` s
+    replay:FILE                       recorded curve, CSV lines of "seconds,rps"
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+from typing import Callable
+
+RateFn = Callable[[float], float]
+
+WARP_STEPS = 4096
+
+
+def _options(arg: str, defaults: dict[str, float]) -> dict[str, float]:
+    opts = dict(defaults)
+    for item in filter(None, arg.split(",")):
+        key, _, value = item.partition("=")
+        if key not in opts:
+            raise ValueError(f"unknown option '{key}' (valid: {', '.join(opts)})")
+        opts[key] = float(value)
+    return opts
+
+
+def load_rps_curve(path: str) -> tuple[list[float], list[float]]:
+    """Read a recorded "seconds,rps" CSV (header and # comments allowed)."""
+    seconds: list[float] = []
+    rps: list[float] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            t, _, r = line.partition(",")
+            try:
+                seconds.append(float(t))
+                rps.append(float(r))
+            except ValueError:
+                continue  # header row
+    if len(seconds) < 2:
+        raise ValueError(f"{path}: need at least two 'seconds,rps' rows")
+    if min(rps) < 0 or max(rps) <= 0:
+        raise ValueError(f"{path}: rps values must be >= 0 and not all zero")
+    return seconds, rps
+
+
+def parse_rate_profile(spec: str, cycle_s: float) -> RateFn:
+    """Build r(t) for t in [0, cycle_s) from a profile spec."""
+    name, _, arg = spec.partition(":")
+    if name == "flat":
+        return lambda t: 1.0
+    if name == "diurnal":
+        o = _options(arg, {"periods": 1, "floor": 0.2})
+        if not 0 < o["floor"] <= 1:
+            raise ValueError("diurnal floor must be in (0, 1]")
+        # Starts at the trough ("midnight"), peaks mid-period
+        return lambda t: o["floor"] + (1 - o["floor"]) * (
+            1 - math.cos(2 * math.pi * o["periods"] * t / cycle_s)
+        ) / 2
+    if name == "step":
+        steps = [float(x) for x in arg.split(",") if x]
+        if not steps or min(steps) <= 0:
+            raise ValueError("step needs positive rates, e.g. step:1,2,4")
+        return lambda t: steps[min(len(steps) - 1, int(t / cycle_s * len(steps)))]
+    if name == "burst":
+        o = _options(arg, {"x": 5, "every": 60, "width": 10})
+        if o["x"] <= 0 or o["every"] <= 0:
+            raise ValueError("burst x and every must be positive")
+        if not 0 < o["width"] <= o["every"]:
+            raise ValueError("burst width must be in (0, every]")
+        return lambda t: o["x"] if (t % o["every"]) < o["width"] else 1.0
+    if name == "replay":
+        seconds, rps = load_rps_curve(arg)
+        span = seconds[-1] - seconds[0]
+        floor = max(rps) * 1e-3  # keep r(t) > 0 so the warp stays invertible
+
+        def replay(t: float) -> float:
+            pos = seconds[0] + t / cycle_s * span
+            i = max(0, bisect.bisect_right(seconds, pos) - 1)
+            return max(rps[i], floor)
+        return replay
+    raise ValueError(f"unknown rate profile '{name}' (flat, diurnal, step, burst, replay)")
+
+
+def build_time_warp(rate: RateFn, cycle_s: float, steps: int = WARP_STEPS):
+    """Return warp(u) -> send offset in seconds, for timeline fraction u in [0, 1].
+
+    warp is the inverse of the normalized cumulative rate, so the share of
+    batches sent in any wall-clock interval is proportional to its integral
+    of r(t).
+    """
+    dt = cycle_s / steps
+    cumulative = [0.0]
+    for i in range(steps):
+        cumulative.append(cumulative[-1] + rate((i + 0.5) * dt) * dt)
+    total = cumulative[-1]
+    cumulative = [c / total for c in cumulative]
+
+    def warp(u: float) -> float:
+        u = min(1.0, max(0.0, u))
+        i = min(steps - 1, max(0, bisect.bisect_right(cumulative, u) - 1))
+        lo, hi = cumulative[i], cumulative[i + 1]
+        frac = (u - lo) / (hi - lo) if hi > lo else 0.0
+        return (i + frac) * dt
+    return warp
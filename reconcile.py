@@ -0,0 +1,200 @@
+"""
+Delivery reconciliation for stream_data.py --reconcile.
+
+Every payload is tagged with `stream.run_id` and `stream.cycle` resource
+attributes. A DeliveryLedger counts the records (spans, log records, metric
+data points) of each request per cycle, split into accepted (HTTP 2xx) and
+rejected. At exit, one GROUP BY count per table asks ClickHouse how many
+records of this run were stored per cycle, so loss can be pinned to a cycle,
+a table and a side of the HTTP boundary:
+
+    rejected   the collector refused the request (or it failed/timed out)
+    missing    accepted with a 2xx but never stored (dropped after accept)
+
+Counts are polled until they match what was accepted or the wait runs out,
+so records still in the collector's batch queue are not reported as lost.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+from clickhouse_http import ClickHouseError, ClickHouseHTTP, quote
+
+RUN_ATTR = "stream.run_id"
+CYCLE_ATTR = "stream.cycle"
+# Stand-in for the cycle number; stream_cycles() replaces it per cycle
+CYCLE_PLACEHOLDER = "__STREAM_CYCLE__"
+
+SIGNAL_TABLE = {"traces": "traces", "logs": "logs", "nginx": "logs", "metrics": "metrics"}
+TABLES = ("traces", "logs", "metrics")
+METRIC_KINDS = ("gauge", "sum", "histogram", "exponentialHistogram", "summary")
+
+# Rewritten timestamps keep each record's distance from its batch, so
+# clamped outliers can land before the run started; look back this far
+LOOKBACK_S = 86400
+POLL_INTERVAL_S = 2.0
+
+COUNT_QUERIES = {
+    "traces": (
+        "SELECT ResourceAttributes['{cycle_attr}'] AS cycle, count() AS n FROM otel_traces "
+        "WHERE Timestamp >= fromUnixTimestamp64Nano(toInt64({since_ns})) "
+        "AND ResourceAttributes['{run_attr}'] = {run_id} GROUP BY cycle"
+    ),
+    "logs": (
+        "SELECT ResourceAttributes['{cycle_attr}'] AS cycle, count() AS n FROM otel_logs "
+        "WHERE TimestampTime >= toDateTime({since_s}) "
+        "AND ResourceAttributes['{run_attr}'] = {run_id} GROUP BY cycle"
+    ),
+}
+METRIC_COUNT_QUERY = (
+    "SELECT ResourceAttributes['{cycle_attr}'] AS cycle, count() AS n FROM {table} "
+    "WHERE TimeUnix >= fromUnixTimestamp64Nano(toInt64({since_ns})) "
+    "AND ResourceAttributes['{run_attr}'] = {run_id} GROUP BY cycle"
+)
+
+
+def count_records(signal_type: str, payload: str) -> int:
+    """Rows a payload becomes in ClickHouse: spans, log records or data points."""
+    data = json.loads(payload)
+    if signal_type == "traces":
+        return sum(
+            len(scope.get("spans", []))
+            for res in data.get("resourceSpans", []) for scope in res.get("scopeSpans", [])
+        )
+    if signal_type == "metrics":
+        return sum(
+            len(metric[kind].get("dataPoints", []))
+            for res in data.get("resourceMetrics", [])
+            for scope in res.get("scopeMetrics", [])
+            for metric in scope.get("metrics", [])
+            for kind in METRIC_KINDS if kind in metric
+        )
+    return sum(
+        len(scope.get("logRecords", []))
+        for res in data.get("resourceLogs", []) for scope in res.get("scopeLogs", [])
+    )
+
+
+class DeliveryLedger:
+    """Records sent per (cycle, table), shared by all stream threads."""
+
+    def __init__(self, batches: list[tuple[str, int, int, str]]):
+        self.run_id = uuid.uuid4().hex[:8]
+        self.batch_records = [count_records(sig, payload) for sig, _, _, payload in batches]
+        self.lock = threading.Lock()
+        # (cycle, table) -> records
+        self.accepted: dict[tuple[int, str], int] = defaultdict(int)
+        self.rejected: dict[tuple[int, str], int] = defaultdict(int)
+
+    def tags(self) -> dict[str, str]:
+        """Resource attributes to inject into every payload."""
+        return {RUN_ATTR: self.run_id, CYCLE_ATTR: CYCLE_PLACEHOLDER}
+
+    def record(self, cycle: int, batch_index: int, signal_type: str, ok: bool):
+        key = (cycle, SIGNAL_TABLE[signal_type])
+        with self.lock:
+            (self.accepted if ok else self.rejected)[key] += self.batch_records[batch_index]
+
+    def stored_counts(self, ch: ClickHouseHTTP, since_s: float) -> dict[tuple[int, str], int]:
+        """Rows of this run per (cycle, table), from one aggregated query per table."""
+        fmt = {
+            "cycle_attr": CYCLE_ATTR, "run_attr": RUN_ATTR, "run_id": quote(self.run_id),
+            "since_ns": int(since_s * 1e9), "since_s": int(since_s),
+        }
+        queries = {table: sql.format(**fmt) for table, sql in COUNT_QUERIES.items()}
+        metric_tables = [
+            row["name"] for row in ch.query(
+                "SELECT name FROM system.tables "
+                "WHERE database = currentDatabase() AND name LIKE 'otel_metrics_%'"
+            )
+        ]
+        if metric_tables:
+            queries["metrics"] = (
+                "SELECT cycle, sum(n) AS n FROM ("
+                + " UNION ALL ".join(METRIC_COUNT_QUERY.format(table=t, **fmt) for t in metric_tables)
+                + ") GROUP BY cycle"
+            )
+        stored: dict[tuple[int, str], int] = defaultdict(int)
+        for table, sql in queries.items():
+            for row in ch.query(sql):
+                if str(row["cycle"]).isdigit():
+                    stored[(int(row["cycle"]), table)] += int(row["n"])
+        return stored
+
+    def reconcile(self, ch: ClickHouseHTTP, started_s: float, wait_s: float) -> str:
+        """Poll stored counts until they reach the accepted counts or wait_s passes."""
+        since_s = started_s - LOOKBACK_S
+        deadline = time.time() + wait_s
+        waited_start = time.time()
+        stored: dict[tuple[int, str], int] = {}
+        error = None
+        while True:
+            try:
+                stored = self.stored_counts(ch, since_s)
+                error = None
+            except (ClickHouseError, requests.RequestException) as e:
+                error = str(e)
+            with self.lock:
+                caught_up = all(stored.get(k, 0) >= n for k, n in self.accepted.items())
+            if (caught_up and not error) or time.time() >= deadline:
+                break
+            time.sleep(POLL_INTERVAL_S)
+        if error:
+            return f"Delivery reconciliation failed: {error}"
+        return self.report(stored, time.time() - waited_start)
+
+    def report(self, stored: dict[tuple[int, str], int], waited_s: float) -> str:
+        with self.lock:
+            accepted, rejected = dict(self.accepted), dict(self.rejected)
+        keys = sorted(set(accepted) | set(rejected), key=lambda k: (k[0], TABLES.index(k[1])))
+        lines = [
+            f"Delivery reconciliation (run {self.run_id}, waited {waited_s:.0f}s for stragglers):",
+            f"  {'cycle':>5} {'table':<8} {'sent':>11} {'rejected':>9} {'stored':>11} "
+            f"{'missing':>9} {'loss':>7}",
+        ]
+        totals: dict[str, list[int]] = {t: [0, 0, 0] for t in TABLES}
+        for cycle, table in keys:
+            acc, rej = accepted.get((cycle, table), 0), rejected.get((cycle, table), 0)
+            got = stored.get((cycle, table), 0)
+            totals[table][0] += acc + rej
+            totals[table][1] += rej
+            totals[table][2] += got
+            lines.append(_row(str(cycle), table, acc + rej, rej, got))
+        for table, (sent, rej, got) in totals.items():
+            if sent:
+                lines.append(_row("total", table, sent, rej, got))
+
+        rejected_total = sum(rejected.values())
+        missing = {k: accepted[k] - stored.get(k, 0) for k in accepted if accepted[k] > stored.get(k, 0)}
+        if not rejected_total and not missing:
+            lines.append("  No loss: every sent record is stored.")
+            return "\n".join(lines)
+        if rejected_total:
+            lines.append(f"  {rejected_total:,} records rejected at the HTTP boundary (non-2xx or failed request)")
+        if missing:
+            worst = sorted(missing.items(), key=lambda kv: -kv[1])[:5]
+            where = ", ".join(f"cycle {c} {t} ({n:,})" for (c, t), n in worst)
+            lines.append(
+                f"  {sum(missing.values()):,} records accepted with a 2xx but not stored "
+                f"(dropped after accept): {where}"
+            )
+        extra = sum(max(0, stored.get(k, 0) - accepted.get(k, 0)) for k in set(stored))
+        if extra:
+            lines.append(f"  {extra:,} records stored beyond those accepted (timed-out requests that landed, or retries)")
+        return "\n".join(lines)
+
+
+def _row(cycle: str, table: str, sent: int, rejected: int, stored: int) -> str:
+    missing = max(0, sent - rejected - stored)
+    loss = (sent - stored) / sent * 100 if sent else 0.0
+    return (
+        f"  {cycle:>5} {table:<8} {sent:>11,} {rejected:>9,} {stored:>11,} "
+        f"{missing:>9,} {max(loss, 0.0):>6.2f}%"
+    )
@@ -0,0 +1,164 @@
+"""
+Load-time sampling for stream_data.py --sample.
+
+Traces use head sampling on the TraceId: a trace is kept when the low 56
+bits of its ID (the randomness OTel's consistent probability sampling uses)
+fall below rate * 2**56. The decision depends only on the ID, so every span
+of a kept trace is kept in every batch, and logs carrying that TraceId are
+kept with it. Logs without trace context and metric data points are rate
+limited per service instead: at most N records per service per second of
+the recorded timeline.
+
+Spec: comma-separated key=value, e.g. "traces=0.1,logs=50,metrics=200"
+    traces=FRACTION   head-sampling rate for traces and trace-correlated logs
+    logs=N            max uncorrelated log records per service per second;
+                      nginx access logs get a separate budget of the same size
+    metrics=N         max metric data points per service per second
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+
+RANDOMNESS_BITS = 56
+METRIC_KINDS = ("gauge", "sum", "histogram", "exponentialHistogram", "summary")
+
+
+def parse_sample_spec(spec: str) -> dict[str, float]:
+    opts: dict[str, float] = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        key, _, value = item.partition("=")
+        if key not in ("traces", "logs", "metrics"):
+            raise ValueError(f"unknown key '{key}' (traces, logs, metrics)")
+        try:
+            opts[key] = float(value)
+        except ValueError:
+            raise ValueError(f"{key}: expected a number, got {value!r}") from None
+        if opts[key] < 0 or (key == "traces" and opts[key] > 1):
+            raise ValueError(f"{key}={value} out of range")
+    return opts
+
+
+def _service(resource_entry: dict) -> str:
+    for attr in resource_entry.get("resource", {}).get("attributes", []):
+        if attr.get("key") == "service.name":
+            return attr.get("value", {}).get("stringValue", "")
+    return ""
+
+
+class Sampler:
+    """Payload stage that drops records; keeps kept/dropped counts per signal."""
+
+    name = "sampling"
+
+    def __init__(self, traces: float | None = None, logs: float | None = None,
+                 metrics: float | None = None):
+        self.trace_threshold = None if traces is None else int(traces * (1 << RANDOMNESS_BITS))
+        self.limits = {"logs": logs, "nginx": logs, "metrics": metrics}
+        # (signal, service, second) -> records kept so far
+        self.window_counts: dict[tuple[str, str, int], int] = defaultdict(int)
+        self.kept: dict[str, int] = defaultdict(int)
+        self.dropped: dict[str, int] = defaultdict(int)
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "Sampler":
+        return cls(**parse_sample_spec(spec))
+
+    def keep_trace(self, trace_id: str) -> bool:
+        if self.trace_threshold is None or len(trace_id) < 14:
+            return True
+        try:
+            return int(trace_id[-14:], 16) < self.trace_threshold
+        except ValueError:
+            return True
+
+    def _within_limit(self, signal: str, service: str, ts: str | int | None) -> bool:
+        limit = self.limits[signal]
+        if limit is None:
+            return True
+        key = (signal, service, int(ts or 0) // 1_000_000_000)
+        if self.window_counts[key] >= limit:
+            return False
+        self.window_counts[key] += 1
+        return True
+
+    def _count(self, signal: str, before: int, after: int):
+        self.kept[signal] += after
+        self.dropped[signal] += before - after
+
+    def process(self, signal_type: str, data: dict) -> bool:
+        """Filter a parsed OTLP payload in place; False when nothing is left."""
+        if signal_type == "traces":
+            return self._filter(signal_type, data, "resourceSpans", "scopeSpans", "spans", self._keep_span)
+        if signal_type in ("logs", "nginx"):
+            return self._filter(signal_type, data, "resourceLogs", "scopeLogs", "logRecords", self._keep_log)
+        if signal_type == "metrics":
+            return self._filter_metrics(data)
+        return True
+
+    def _keep_span(self, signal: str, span: dict, service: str) -> bool:
+        return self.keep_trace(span.get("traceId", ""))
+
+    def _keep_log(self, signal: str, record: dict, service: str) -> bool:
+        if record.get("traceId"):
+            return self.keep_trace(record["traceId"])
+        ts = record.get("timeUnixNano") or record.get("observedTimeUnixNano")
+        return self._within_limit(signal, service, ts)
+
+    def _filter(self, signal: str, data: dict, res_key: str, scope_key: str, items_key: str,
+                keep) -> bool:
+        resources = []
+        for res in data.get(res_key, []):
+            service = _service(res)
+            scopes = []
+            for scope in res.get(scope_key, []):
+                items = scope.get(items_key, [])
+                kept = [item for item in items if keep(signal, item, service)]
+                self._count(signal, len(items), len(kept))
+                if kept:
+                    scope[items_key] = kept
+                    scopes.append(scope)
+            if scopes:
+                res[scope_key] = scopes
+                resources.append(res)
+        data[res_key] = resources
+        return bool(resources)
+
+    def _filter_metrics(self, data: dict) -> bool:
+        resources = []
+        for res in data.get("resourceMetrics", []):
+            service = _service(res)
+            scopes = []
+            for scope in res.get("scopeMetrics", []):
+                metrics = []
+                for metric in scope.get("metrics", []):
+                    body = next((metric[k] for k in METRIC_KINDS if k in metric), None)
+                    if body is None:
+                        metrics.append(metric)
+                        continue
+                    points = body.get("dataPoints", [])
+                    kept = [
+                        dp for dp in points
+                        if self._within_limit("metrics", service, dp.get("timeUnixNano"))
+                    ]
+                    self._count("metrics", len(points), len(kept))
+                    if kept:
+                        body["dataPoints"] = kept
+                        metrics.append(metric)
+                if metrics:
+                    scope["metrics"] = metrics
+                    scopes.append(scope)
+            if scopes:
+                res["scopeMetrics"] = scopes
+                resources.append(res)
+        data["resourceMetrics"] = resources
+        return bool(resources)
+
+    def report(self) -> str:
+        lines = ["Sampling:"]
+        for signal in sorted(set(self.kept) | set(self.dropped)):
+            kept, dropped = self.kept[signal], self.dropped[signal]
+            total = kept + dropped
+            pct = kept / total * 100 if total else 100.0
+            lines.append(f"  {signal:<8} kept {kept:>10,} dropped {dropped:>10,} ({pct:.1f}% kept)")
+        return "\n".join(lines)
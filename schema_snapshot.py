@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Capture a compact ClickHouse schema snapshot and validate dashboards against it.
+
+The hyperdx-dashboard skill's discovery workflow sends one query per
+question (tables, columns, services, Map keys, metric names). `capture`
+answers all of them in four batched queries and caches the result as JSON;
+`validate` then checks dashboard definitions against the cached snapshot
+locally, catching unknown metric names, columns, Map keys and services
+before anything is POSTed to the v2 API.
+
+Usage:
+    python schema_snapshot.py capture                  # Refresh .schema_snapshot.json
+    python schema_snapshot.py show                     # Summarize the cached snapshot
+    python schema_snapshot.py validate                 # Check the bundled deploy_*.py dashboards
+    python schema_snapshot.py validate my_dash.json deploy_nginx_dashboard.py
+    python schema_snapshot.py validate --ttl 600       # Re-capture if older than 10 min
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+
+import requests
+from dotenv import load_dotenv
+
+import lucene
+from clickhouse_http import ClickHouseError, ClickHouseHTTP
+
+load_dotenv()
+
+SNAPSHOT_PATH = ".schema_snapshot.json"
+DEFAULT_TTL_S = 3600
+
+# Rows sampled per table when collecting Map keys, and keys kept per column
+MAP_KEY_SAMPLE_ROWS = 200_000
+MAP_KEY_LIMIT = 500
+SPAN_NAME_LIMIT = 100
+
+DEFAULT_DASHBOARDS = (
+    "deploy_checkout_dashboard.py",
+    "deploy_nginx_dashboard.py",
+    "create_metrics_dashboard.py",
+)
+
+SOURCE_TABLES = {"trace": "otel_traces", "log": "otel_logs"}
+METRIC_TYPES = ("gauge", "sum", "histogram", "summary", "exponential_histogram")
+MAP_COLUMNS = {
+    "otel_traces": ("SpanAttributes", "ResourceAttributes"),
+    "otel_logs": ("LogAttributes", "ResourceAttributes"),
+    "otel_metrics_gauge": ("Attributes", "ResourceAttributes"),
+    "otel_metrics_sum": ("Attributes", "ResourceAttributes"),
+    "otel_metrics_histogram": ("Attributes", "ResourceAttributes"),
+}
+
+VALID_SERIES_TYPES = {"time", "number", "table", "search", "markdown"}
+VALID_AGG_FNS = {
+    "avg", "count", "count_distinct", "last_value", "max", "min",
+    "quantile", "sum", "any", "none",
+}
+MAP_REF_RE = re.compile(r"\b([A-Za-z_]\w*)\['([^']*)'\]")
+IDENT_RE = re.compile(r"^[A-Za-z_]\w*$")
+
+
+# ── Capture ───────────────────────────────────────────────────────────────
+
+
+def capture(ch: ClickHouseHTTP) -> dict:
+    """Collect the snapshot with four batched queries."""
+    tables: dict[str, dict[str, str]] = {}
+    for row in ch.query(
+        "SELECT table, name, type FROM system.columns "
+        "WHERE database = currentDatabase() "
+        "AND (table LIKE 'otel\\\\_%' OR table = 'hyperdx_sessions') "
+        "ORDER BY table, position"
+    ):
+        tables.setdefault(row["table"], {})[row["name"]] = row["type"]
+
+    # Services (and top span names) per signal, in one UNION ALL
+    parts = []
+    if "otel_traces" in tables:
+        parts.append(
+            "SELECT 'traces' AS signal, ServiceName AS service, count() AS rows, "
+            f"topK({SPAN_NAME_LIMIT})(SpanName) AS names FROM otel_traces GROUP BY ServiceName"
+        )
+    if "otel_logs" in tables:
+        parts.append(
+            "SELECT 'logs', ServiceName, count(), CAST([], 'Array(String)') "
+            "FROM otel_logs GROUP BY ServiceName"
+        )
+    services: dict[str, dict] = {}
+    if parts:
+        for row in ch.query(" UNION ALL ".join(parts)):
+            services.setdefault(row["signal"], {})[row["service"]] = {
+                "rows": int(row["rows"]), "span_names": row["names"],
+            }
+
+    # Metric names, types and services across all metric tables
+    parts = [
+        f"SELECT '{t}' AS type, MetricName AS name, any(MetricUnit) AS unit, "
+        f"count() AS rows, groupUniqArray(50)(ServiceName) AS services "
+        f"FROM otel_metrics_{t} GROUP BY MetricName"
+        for t in METRIC_TYPES if f"otel_metrics_{t}" in tables
+    ]
+    metrics: dict[str, dict] = {}
+    if parts:
+        for row in ch.query(" UNION ALL ".join(parts)):
+            m = metrics.setdefault(row["name"], {"types": [], "unit": row["unit"], "rows": 0})
+            m["types"].append(row["type"])
+            m["rows"] += int(row["rows"])
+            services.setdefault("metrics", {})
+            for svc in row["services"]:
+                services["metrics"].setdefault(svc, {"rows": 0, "span_names": []})
+
+    # Top Map keys per (table, column) from a bounded row sample
+    parts = [
+        f"SELECT * FROM (SELECT '{table}' AS tbl, '{col}' AS col, key, count() AS n "
+        f"FROM (SELECT {col} FROM {table} LIMIT {MAP_KEY_SAMPLE_ROWS}) "
+        f"ARRAY JOIN mapKeys({col}) AS key GROUP BY key ORDER BY n DESC LIMIT {MAP_KEY_LIMIT})"
+        for table, cols in MAP_COLUMNS.items() if table in tables
+        for col in cols if col in tables[table]
+    ]
+    map_keys: dict[str, dict[str, list[str]]] = {}
+    if parts:
+        for row in ch.query(" UNION ALL ".join(parts)):
+            map_keys.setdefault(row["tbl"], {}).setdefault(row["col"], []).append(row["key"])
+
+    return {
+        "captured_at": time.time(),
+        "clickhouse_url": ch.url,
+        "map_key_limit": MAP_KEY_LIMIT,
+        "tables": tables,
+        "services": services,
+        "metrics": metrics,
+        "map_keys": map_keys,
+    }
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH, ttl_s: float = DEFAULT_TTL_S,
+                  offline: bool = False) -> dict:
+    """Return the cached snapshot, re-capturing it if missing or older than ttl_s."""
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if offline or time.time() - snapshot.get("captured_at", 0) < ttl_s:
+            return snapshot
+    elif offline:
+        sys.exit(f"{path} not found; run `python schema_snapshot.py capture` first.")
+    snapshot = capture(ClickHouseHTTP())
+    save_snapshot(snapshot, path)
+    return snapshot
+
+
+def save_snapshot(snapshot: dict, path: str = SNAPSHOT_PATH):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# ── Validation ────────────────────────────────────────────────────────────
+
+
+class Findings:
+    def __init__(self):
+        self.errors: list[str] = []
+        self.warnings: list[str] = []
+
+    def error(self, where: str, msg: str):
+        self.errors.append(f"{where}: {msg}")
+
+    def warn(self, where: str, msg: str):
+        self.warnings.append(f"{where}: {msg}")
+
+
+def _series_table(snapshot: dict, kind: str | None, series: dict) -> str | None:
+    if kind == "metric":
+        data_type = (series.get("metricDataType") or "").replace(" ", "_")
+        return f"otel_metrics_{data_type}"
+    return SOURCE_TABLES.get(kind or "")
+
+
+def _check_column_ref(snapshot: dict, table: str, expr: str, loc: str, out: Findings):
+    """Validate Map['key'] references and plain column names in an expression."""
+    columns = snapshot["tables"].get(table, {})
+    for col, key in MAP_REF_RE.findall(expr):
+        _check_map_key(snapshot, table, col, key, loc, out)
+    if IDENT_RE.match(expr) and expr not in columns:
+        out.error(loc, f"unknown column '{expr}' in {table}")
+
+
+def _check_map_key(snapshot: dict, table: str, col: str, key: str, loc: str, out: Findings):
+    columns = snapshot["tables"].get(table, {})
+    if col not in columns:
+        out.error(loc, f"unknown column '{col}' in {table}")
+        return
+    if not columns[col].startswith("Map("):
+        out.error(loc, f"'{col}' in {table} is {columns[col]}, not a Map")
+        return
+    keys = snapshot["map_keys"].get(table, {}).get(col)
+    if keys is None or key in keys:
+        return
+    if len(keys) < snapshot.get("map_key_limit", MAP_KEY_LIMIT):
+        out.error(loc, f"{col} has no key '{key}' in {table}")
+    else:
+        out.warn(loc, f"{col} key '{key}' not among the top {len(keys)} keys in {table}")
+
+
+def _check_where(snapshot: dict, table: str, signal: str, where: str, loc: str, out: Findings):
+    try:
+        node = lucene.parse(where)
+    except lucene.LuceneSyntaxError as e:
+        out.error(loc, f"where: {e}")
+        return
+    columns = snapshot["tables"].get(table, {})
+    services = snapshot["services"].get(signal, {})
+    for term in lucene.terms(node):
+        if term.field is None:
+            continue
+        if term.field == "type" and term.value in ("span", "log"):
+            out.error(loc, f"where uses type:{term.value}, which silently matches nothing")
+            continue
+        col, _, key = term.field.partition(".")
+        if key:
+            _check_map_key(snapshot, table, col, key, loc, out)
+        elif col not in columns:
+            out.error(loc, f"where: unknown column '{col}' in {table}")
+        elif col == "ServiceName" and services and term.op == ":":
+            if term.wildcard:
+                if not fnmatch.filter(services, term.value):
+                    out.warn(loc, f"where: no {signal} service matches '{term.value}'")
+            elif term.value not in services:
+                out.warn(loc, f"where: no {signal} data for service '{term.value}'")
+
+
+def validate_dashboard(dashboard: dict, snapshot: dict,
+                       source_kinds: dict[str, str] | None = None) -> Findings:
+    """Check one dashboard definition against the snapshot."""
+    out = Findings()
+    kinds = {"trace": "trace", "log": "log", "metric": "metric", **(source_kinds or {})}
+    signals = {"trace": "traces", "log": "logs", "metric": "metrics"}
+
+    if not isinstance(dashboard.get("tags"), list):
+        out.error(dashboard.get("name", "dashboard"), "missing 'tags' list")
+    for t, tile in enumerate(dashboard.get("tiles", [])):
+        tloc = f"tile {t} '{tile.get('name', '')}'"
+        if not tile.get("name"):
+            out.error(tloc, "tile name is required")
+        if tile.get("x", 0) + tile.get("w", 0) > 24:
+            out.error(tloc, f"x + w = {tile.get('x', 0) + tile.get('w', 0)} exceeds 24 columns")
+        series_list = tile.get("series", [])
+        if len({s.get("type") for s in series_list}) > 1:
+            out.error(tloc, "all series in a tile must have the same type")
+        for i, series in enumerate(series_list):
+            loc = f"{tloc} series {i}"
+            stype = series.get("type")
+            if stype not in VALID_SERIES_TYPES:
+                out.error(loc, f"invalid series type '{stype}'")
+                continue
+            if stype == "markdown":
+                continue
+            agg = series.get("aggFn")
+            if stype != "search":
+                if agg not in VALID_AGG_FNS:
+                    out.error(loc, f"invalid aggFn '{agg}'")
+                if agg == "quantile" and "level" not in series:
+                    out.error(loc, "quantile aggFn requires 'level'")
+                if agg == "count" and series.get("field"):
+                    out.error(loc, "count must have an empty field")
+            if series.get("where") and series.get("whereLanguage") != "lucene":
+                out.warn(loc, "where without whereLanguage: \"lucene\"")
+
+            source_id = series.get("sourceId")
+            kind = kinds.get(source_id) or ("metric" if series.get("metricName") else None)
+            if kind is None:
+                out.warn(loc, f"cannot resolve sourceId '{source_id}' (pass --api to look it up)")
+                continue
+            table = _series_table(snapshot, kind, series)
+            if table not in snapshot["tables"]:
+                out.error(loc, f"table {table} does not exist")
+                continue
+
+            if kind == "metric":
+                name = series.get("metricName")
+                metric = snapshot["metrics"].get(name)
+                data_type = (series.get("metricDataType") or "").replace(" ", "_")
+                if not name or not data_type:
+                    out.error(loc, "metrics series need metricName and metricDataType")
+                elif metric is None:
+                    close = [m for m in snapshot["metrics"] if name.split(".")[0] in m][:3]
+                    hint = f" (similar: {', '.join(close)})" if close else ""
+                    out.error(loc, f"unknown metricName '{name}'{hint}")
+                elif data_type not in metric["types"]:
+                    out.error(
+                        loc, f"metric '{name}' is {'/'.join(metric['types'])}, not {data_type}",
+                    )
+                if data_type == "histogram" and "ServiceName" in series.get("groupBy", []):
+                    out.error(loc, "histogram metrics cannot groupBy ServiceName")
+
+            if series.get("field"):
+                _check_column_ref(snapshot, table, series["field"], loc, out)
+            for group in series.get("groupBy", []) or []:
+                if not isinstance(group, str):
+                    out.error(loc, "groupBy entries must be strings")
+                    continue
+                _check_column_ref(snapshot, table, group, loc, out)
+            if series.get("where"):
+                _check_where(snapshot, table, signals[kind], series["where"], loc, out)
+    return out
+
+
+def load_dashboards(path: str) -> list[dict]:
+    """Load dashboards from a JSON file or a script exposing build_dashboard(src)."""
+    if path.endswith(".py"):
+        spec = importlib.util.spec_from_file_location(
+            f"_dashboard_{os.path.basename(path)[:-3]}", path,
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if not hasattr(module, "build_dashboard"):
+            raise ValueError(f"{path} has no build_dashboard(src) function")
+        # Source kinds stand in for IDs so each series' signal is known
+        return [module.build_dashboard({k: k for k in ("trace", "log", "metric", "session")})]
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────
+
+
+def show(snapshot: dict):
+    age = time.time() - snapshot["captured_at"]
+    print(f"Snapshot of {snapshot['clickhouse_url']} ({age:.0f}s old)")
+    for table, cols in sorted(snapshot["tables"].items()):
+        maps = snapshot["map_keys"].get(table, {})
+        key_str = ", ".join(f"{c}: {len(k)} keys" for c, k in maps.items())
+        print(f"  {table:<36} {len(cols):>3} columns{f'  ({key_str})' if key_str else ''}")
+    for signal, services in sorted(snapshot["services"].items()):
+        print(f"  {signal} services ({len(services)}): {', '.join(sorted(services))}")
+    by_type: dict[str, int] = {}
+    for m in snapshot["metrics"].values():
+        for t in m["types"]:
+            by_type[t] = by_type.get(t, 0) + 1
+    print(f"  metrics: {len(snapshot['metrics'])} names ({by_type})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClickHouse schema snapshot and dashboard validation")
+    parser.add_argument("command", choices=("capture", "show", "validate"))
+    parser.add_argument("targets", nargs="*", help="validate: dashboard .py scripts or .json files")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help=f"Cache file (default: {SNAPSHOT_PATH})")
+    parser.add_argument(
+        "--ttl", type=float, default=DEFAULT_TTL_S,
+        help=f"Re-capture when the cache is older than this many seconds (default: {DEFAULT_TTL_S})",
+    )
+    parser.add_argument("--offline", action="store_true", help="Never query ClickHouse; use the cache as-is")
+    parser.add_argument(
+        "--api", help="ClickStack API URL used to map real sourceIds to kinds (e.g. http://localhost:8000)",
+    )
+    parser.add_argument("--strict", action="store_true", help="Treat warnings as errors")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "capture":
+            start = time.perf_counter()
+            snapshot = capture(ClickHouseHTTP())
+            save_snapshot(snapshot, args.snapshot)
+            print(f"Captured snapshot in {(time.perf_counter() - start) * 1000:.0f} ms -> {args.snapshot}")
+            show(snapshot)
+            return
+        snapshot = load_snapshot(args.snapshot, args.ttl, args.offline)
+    except (ClickHouseError, requests.RequestException) as e:
+        sys.exit(f"  ERROR: schema capture failed: {e}")
+
+    if args.command == "show":
+        show(snapshot)
+        return
+
+    source_kinds = None
+    if args.api:
+        sources = requests.get(f"{args.api.rstrip('/')}/sources", timeout=5).json()
+        source_kinds = {s["id"]: s["kind"] for s in sources}
+
+    failed = False
+    for target in args.targets or DEFAULT_DASHBOARDS:
+        start = time.perf_counter()
+        for dashboard in load_dashboards(target):
+            findings = validate_dashboard(dashboard, snapshot, source_kinds)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            bad = findings.errors or (args.strict and findings.warnings)
+            status = "FAIL" if bad else "ok"
+            failed = failed or bool(bad)
+            print(
+                f"[{status}] {target}: '{dashboard.get('name')}' "
+                f"({len(dashboard.get('tiles', []))} tiles, {elapsed_ms:.1f} ms)"
+            )
+            for e in findings.errors:
+                print(f"    ERROR  {e}")
+            for w in findings.warnings:
+                print(f"    WARN   {w}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Report how much disk each OTel signal costs in ClickHouse, and what other codecs would save.
+
+Reads system.parts / system.columns / system.merges for the otel_* tables:
+compressed and uncompressed bytes per table and column, bytes per record
+per signal, active part counts and the merge/mutation backlog. With
+--codecs it also copies a sample of each table into shadow tables whose
+columns use alternate codecs (ZSTD levels, LZ4, Delta/DoubleDelta on
+timestamps), merges them, and compares size, insert time and scan time
+against a shadow copy with the original codecs.
+
+Shadow tables need CREATE/INSERT/DROP rights; the read-only `api` user of
+ClickStack local mode usually lacks them, so set CLICKHOUSE_USER=default.
+
+Usage:
+    python storage_report.py                           # Tables, signals, parts, merges
+    python storage_report.py --columns 20              # Top 20 columns per table
+    python storage_report.py --json > storage.json     # Machine-readable report
+    python storage_report.py --codecs --tables otel_logs --sample 200000
+    python storage_report.py --codecs zstd:1,zstd:9,doubledelta:3 --keep
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+
+import requests
+from dotenv import load_dotenv
+
+from clickhouse_http import ClickHouseError, ClickHouseHTTP
+
+load_dotenv()
+
+DEFAULT_CODECS = "zstd:1,zstd:3,zstd:9,lz4,delta:3,doubledelta:3"
+DEFAULT_SAMPLE_ROWS = 100_000
+SHADOW_MARKER = "__codec_"
+SIGNAL_PREFIXES = (("otel_traces", "traces"), ("otel_logs", "logs"), ("otel_metrics", "metrics"))
+# Tables whose rows count as the signal's records (others are MV/lookup overhead)
+RECORD_TABLES = {"traces": ("otel_traces",), "logs": ("otel_logs",), "metrics": None}
+TIME_TYPE_RE = re.compile(r"^(Nullable\()?DateTime")
+
+
+def fmt_bytes(n: float) -> str:
+    if abs(n) < 1024:
+        return f"{n:.0f} B"
+    for unit in ("KiB", "MiB", "GiB", "TiB"):
+        n /= 1024
+        if abs(n) < 1024 or unit == "TiB":
+            return f"{n:.1f} {unit}"
+
+
+def signal_of(table: str) -> str:
+    for prefix, signal in SIGNAL_PREFIXES:
+        if table.startswith(prefix):
+            return signal
+    return "other"
+
+
+# ── Current storage ───────────────────────────────────────────────────────
+
+
+def collect(ch: ClickHouseHTTP, column_limit: int) -> dict:
+    """Sizes, part counts and merge backlog for the otel_* tables."""
+    otel_filter = (
+        "database = currentDatabase() AND table LIKE 'otel\\\\_%' "
+        f"AND position(table, '{SHADOW_MARKER}') = 0"
+    )
+    tables = {
+        row["table"]: {
+            "rows": int(row["rows"]),
+            "parts": int(row["parts"]),
+            "partitions": int(row["partitions"]),
+            "max_parts_per_partition": 0,
+            "compressed": int(row["compressed"]),
+            "uncompressed": int(row["uncompressed"]),
+            "primary_key_bytes": int(row["pk_bytes"]),
+            "merges": 0, "merging_parts": 0, "merge_bytes": 0,
+            "mutations": 0, "columns": [],
+        }
+        for row in ch.query(
+            "SELECT table, sum(rows) AS rows, count() AS parts, uniqExact(partition) AS partitions, "
+            "sum(data_compressed_bytes) AS compressed, sum(data_uncompressed_bytes) AS uncompressed, "
+            "sum(primary_key_bytes_in_memory) AS pk_bytes "
+            f"FROM system.parts WHERE active AND {otel_filter} GROUP BY table ORDER BY compressed DESC"
+        )
+    }
+    if not tables:
+        return {"tables": {}, "signals": {}}
+
+    for row in ch.query(
+        "SELECT table, max(n) AS max_parts FROM (SELECT table, partition, count() AS n "
+        f"FROM system.parts WHERE active AND {otel_filter} GROUP BY table, partition) GROUP BY table"
+    ):
+        tables[row["table"]]["max_parts_per_partition"] = int(row["max_parts"])
+
+    for row in ch.query(
+        "SELECT table, count() AS merges, sum(num_parts) AS parts, "
+        "sum(total_size_bytes_compressed) AS bytes "
+        f"FROM system.merges WHERE {otel_filter} GROUP BY table"
+    ):
+        if row["table"] in tables:
+            t = tables[row["table"]]
+            t["merges"], t["merging_parts"], t["merge_bytes"] = (
+                int(row["merges"]), int(row["parts"]), int(row["bytes"]),
+            )
+
+    for row in ch.query(
+        f"SELECT table, count() AS n FROM system.mutations WHERE NOT is_done AND {otel_filter} "
+        "GROUP BY table"
+    ):
+        if row["table"] in tables:
+            tables[row["table"]]["mutations"] = int(row["n"])
+
+    for row in ch.query(
+        "SELECT table, name, type, compression_codec AS codec, "
+        "data_compressed_bytes AS compressed, data_uncompressed_bytes AS uncompressed "
+        f"FROM system.columns WHERE {otel_filter} "
+        "ORDER BY table, data_compressed_bytes DESC "
+        f"LIMIT {column_limit} BY table"
+    ):
+        if row["table"] in tables:
+            tables[row["table"]]["columns"].append({
+                "name": row["name"], "type": row["type"], "codec": row["codec"],
+                "compressed": int(row["compressed"]), "uncompressed": int(row["uncompressed"]),
+            })
+
+    # Bytes per record: every table of a signal (incl. MV targets) over its record rows
+    signals: dict[str, dict] = {}
+    for name, t in tables.items():
+        signal = signal_of(name)
+        s = signals.setdefault(signal, {"records": 0, "compressed": 0, "uncompressed": 0, "tables": 0})
+        s["compressed"] += t["compressed"]
+        s["uncompressed"] += t["uncompressed"]
+        s["tables"] += 1
+        record_tables = RECORD_TABLES.get(signal)
+        if record_tables is None or name in record_tables:
+            s["records"] += t["rows"]
+    for s in signals.values():
+        s["bytes_per_record"] = s["compressed"] / s["records"] if s["records"] else None
+        s["raw_bytes_per_record"] = s["uncompressed"] / s["records"] if s["records"] else None
+
+    return {"tables": tables, "signals": signals}
+
+
+def print_report(report: dict):
+    tables, signals = report["tables"], report["signals"]
+    if not tables:
+        print("No otel_* tables with data. Run ./setup.sh or stream_data.py first.")
+        return
+
+    print("Signals")
+    print(f"  {'signal':<9} {'records':>12} {'compressed':>12} {'raw':>12} {'B/record':>9} {'raw B/rec':>9}")
+    for name, s in signals.items():
+        bpr = f"{s['bytes_per_record']:.1f}" if s["bytes_per_record"] is not None else "-"
+        raw = f"{s['raw_bytes_per_record']:.1f}" if s["raw_bytes_per_record"] is not None else "-"
+        print(f"  {name:<9} {s['records']:>12,} {fmt_bytes(s['compressed']):>12} "
+              f"{fmt_bytes(s['uncompressed']):>12} {bpr:>9} {raw:>9}")
+
+    print("\nTables")
+    print(f"  {'table':<34} {'rows':>12} {'compressed':>12} {'ratio':>6} "
+          f"{'parts':>6} {'max/part.':>9} {'merges':>7} {'mutations':>9}")
+    for name, t in tables.items():
+        ratio = t["uncompressed"] / t["compressed"] if t["compressed"] else 0
+        merges = f"{t['merges']} ({t['merging_parts']}p)" if t["merges"] else "0"
+        print(f"  {name:<34} {t['rows']:>12,} {fmt_bytes(t['compressed']):>12} {ratio:>5.1f}x "
+              f"{t['parts']:>6} {t['max_parts_per_partition']:>9} {merges:>7} {t['mutations']:>9}")
+
+    for name, t in tables.items():
+        if not t["columns"] or not t["compressed"]:
+            continue
+        print(f"\n{name} — top columns")
+        for c in t["columns"]:
+            share = c["compressed"] / t["compressed"] * 100
+            ratio = c["uncompressed"] / c["compressed"] if c["compressed"] else 0
+            print(f"  {c['name']:<28} {fmt_bytes(c['compressed']):>11} {share:>5.1f}% "
+                  f"{ratio:>6.1f}x  {c['codec'] or 'default'}")
+
+
+# ── Codec comparison ──────────────────────────────────────────────────────
+
+
+def parse_codec_variants(spec: str) -> list[str]:
+    variants = [v.strip() for v in spec.split(",") if v.strip()]
+    for v in variants:
+        kind, _, level = v.partition(":")
+        if kind not in ("zstd", "lz4", "delta", "doubledelta"):
+            raise ValueError(f"unknown codec variant '{v}' (zstd:N, lz4, delta:N, doubledelta:N)")
+        if level and not level.isdigit():
+            raise ValueError(f"bad level in '{v}'")
+    return variants
+
+
+def variant_codec(variant: str, col_type: str) -> str:
+    """CODEC(...) arguments for a column under a variant."""
+    kind, _, level = variant.partition(":")
+    if kind == "lz4":
+        return "LZ4"
+    zstd = f"ZSTD({level or 1})"
+    if TIME_TYPE_RE.match(col_type) and kind in ("delta", "doubledelta"):
+        return f"{'Delta' if kind == 'delta' else 'DoubleDelta'}, {zstd}"
+    return zstd
+
+
+def shadow_name(table: str, variant: str) -> str:
+    return f"{table}{SHADOW_MARKER}{re.sub(r'[^a-z0-9]+', '_', variant)}"
+
+
+def build_shadow(ch: ClickHouseHTTP, table: str, variant: str | None,
+                 columns: list[dict], sample_rows: int) -> dict:
+    """Create a shadow copy of table with variant codecs, fill and merge it.
+
+    The baseline takes the first sample_rows of table; variants copy the
+    baseline shadow, so every variant compresses exactly the same rows.
+    """
+    name = shadow_name(table, variant or "baseline")
+    ch.execute(f"DROP TABLE IF EXISTS {name}")
+    ch.execute(f"CREATE TABLE {name} AS {table}")
+    # The sample data is often older than the tables' retention TTL, which
+    # would delete it on merge
+    try:
+        ch.execute(f"ALTER TABLE {name} REMOVE TTL")
+    except ClickHouseError:
+        pass
+
+    fallbacks = []
+    if variant:
+        for col in columns:
+            if col["default_kind"] == "ALIAS":
+                continue
+            codec = variant_codec(variant, col["type"])
+            try:
+                ch.execute(f"ALTER TABLE {name} MODIFY COLUMN `{col['name']}` CODEC({codec})")
+            except ClickHouseError:
+                # e.g. Delta on a non-numeric substream; fall back to the plain level
+                plain = variant_codec(variant.replace("doubledelta", "zstd").replace("delta", "zstd"), "")
+                try:
+                    ch.execute(f"ALTER TABLE {name} MODIFY COLUMN `{col['name']}` CODEC({plain})")
+                    fallbacks.append(col["name"])
+                except ClickHouseError:
+                    fallbacks.append(f"{col['name']} (unchanged)")
+
+    start = time.perf_counter()
+    if variant:
+        ch.execute(f"INSERT INTO {name} SELECT * FROM {shadow_name(table, 'baseline')}")
+    else:
+        ch.execute(f"INSERT INTO {name} SELECT * FROM {table} LIMIT {sample_rows}")
+    ch.execute(f"OPTIMIZE TABLE {name} FINAL")
+    insert_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ch.execute(f"SELECT * FROM {name} FORMAT Null")
+    scan_s = time.perf_counter() - start
+
+    sizes = ch.query(
+        "SELECT sum(rows) AS rows, sum(data_compressed_bytes) AS compressed, "
+        "sum(data_uncompressed_bytes) AS uncompressed "
+        f"FROM system.parts WHERE active AND database = currentDatabase() AND table = '{name}'"
+    )[0]
+    col_sizes = {
+        row["name"]: int(row["compressed"])
+        for row in ch.query(
+            "SELECT name, data_compressed_bytes AS compressed FROM system.columns "
+            f"WHERE database = currentDatabase() AND table = '{name}'"
+        )
+    }
+    return {
+        "table": name, "variant": variant or "baseline",
+        "rows": int(sizes["rows"] or 0),
+        "compressed": int(sizes["compressed"] or 0),
+        "uncompressed": int(sizes["uncompressed"] or 0),
+        "insert_s": insert_s, "scan_s": scan_s,
+        "columns": col_sizes, "fallbacks": fallbacks,
+    }
+
+
+def compare_codecs(ch: ClickHouseHTTP, tables: list[str], variants: list[str],
+                   sample_rows: int, keep: bool) -> dict[str, list[dict]]:
+    """Build baseline + variant shadows for each table; drop them unless keep."""
+    results: dict[str, list[dict]] = {}
+    for table in tables:
+        columns = ch.query(
+            "SELECT name, type, default_kind FROM system.columns "
+            f"WHERE database = currentDatabase() AND table = '{table}' ORDER BY position"
+        )
+        if not columns:
+            print(f"  WARN: {table} not found, skipping", file=sys.stderr)
+            continue
+        print(f"Comparing codecs on {table} ({sample_rows:,} sample rows)...", file=sys.stderr)
+        rows = []
+        try:
+            for variant in [None, *variants]:
+                rows.append(build_shadow(ch, table, variant, columns, sample_rows))
+        finally:
+            if not keep:
+                for variant in [None, *variants]:
+                    ch.execute(f"DROP TABLE IF EXISTS {shadow_name(table, variant or 'baseline')}")
+        results[table] = rows
+    return results
+
+
+def print_codec_comparison(results: dict[str, list[dict]], column_limit: int):
+    for table, rows in results.items():
+        base = rows[0]
+        print(f"\n{table} — codec comparison ({base['rows']:,} rows)")
+        print(f"  {'variant':<15} {'compressed':>12} {'ratio':>6} {'vs base':>8} "
+              f"{'B/row':>8} {'insert s':>9} {'scan s':>7}")
+        for r in rows:
+            ratio = r["uncompressed"] / r["compressed"] if r["compressed"] else 0
+            delta = (r["compressed"] / base["compressed"] - 1) * 100 if base["compressed"] else 0
+            per_row = r["compressed"] / r["rows"] if r["rows"] else 0
+            print(f"  {r['variant']:<15} {fmt_bytes(r['compressed']):>12} {ratio:>5.1f}x "
+                  f"{delta:>+7.1f}% {per_row:>8.1f} {r['insert_s']:>9.2f} {r['scan_s']:>7.2f}")
+            if r["fallbacks"]:
+                print(f"  {'':<15} plain codec used for: {', '.join(r['fallbacks'])}")
+
+        top = sorted(base["columns"], key=base["columns"].get, reverse=True)[:column_limit]
+        print(f"\n  {'column':<28}" + "".join(f" {r['variant']:>13}" for r in rows))
+        for col in top:
+            print(f"  {col:<28}" + "".join(
+                f" {fmt_bytes(r['columns'].get(col, 0)):>13}" for r in rows
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ClickHouse storage and compression report for otel_* tables")
+    parser.add_argument("--columns", type=int, default=10, help="Columns listed per table (default: 10)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument(
+        "--codecs", nargs="?", const=DEFAULT_CODECS, metavar="VARIANTS",
+        help=f"Compare codecs on shadow tables (default variants: {DEFAULT_CODECS})",
+    )
+    parser.add_argument(
+        "--tables", default="otel_traces,otel_logs",
+        help="--codecs: comma-separated tables to compare (default: otel_traces,otel_logs)",
+    )
+    parser.add_argument(
+        "--sample", type=int, default=DEFAULT_SAMPLE_ROWS,
+        help=f"--codecs: rows copied into each shadow table (default: {DEFAULT_SAMPLE_ROWS})",
+    )
+    parser.add_argument("--keep", action="store_true", help="--codecs: keep the shadow tables")
+    args = parser.parse_args()
+
+    ch = ClickHouseHTTP(timeout=600)
+    try:
+        report = collect(ch, args.columns)
+        if args.codecs:
+            variants = parse_codec_variants(args.codecs)
+            tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+            report["codecs"] = compare_codecs(ch, tables, variants, args.sample, args.keep)
+    except ValueError as e:
+        sys.exit(f"--codecs: {e}")
+    except (ClickHouseError, requests.RequestException) as e:
+        sys.exit(f"  ERROR: {e}")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print_report(report)
+    if "codecs" in report:
+        print_codec_comparison(report["codecs"], args.columns)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,24 +14,40 @@ Usage:
     python stream_data.py --nginx          # Only stream NGINX access logs
     python stream_data.py -v               # Verbose (every batch)
     python stream_data.py -q               # Quiet (summary every 30s)
+    python stream_data.py --input sample/  # Pre-extracted dir (or .tar.zst)
+    python stream_data.py --workers 4      # Parse input with 4 processes
+    python stream_data.py --load-bench     # Startup time vs. core count
+    python stream_data.py --synthetic services=50,tps=500  # Generated data
+    python stream_data.py --freshness 5    # Measure ingest-to-visibility lag
+    python stream_data.py --nginx-follow /var/log/nginx/access.log  # Tail a live log
+    python stream_data.py --rate-profile burst:x=5,every=60,width=10  # Traffic spikes
+    python stream_data.py --reconcile      # Check every sent record was stored
+    python stream_data.py --profile        # Per-stage time/bytes/allocation breakdown
 """
 
 from __future__ import annotations
 
 import argparse
-import io
+import atexit
 import json
 import os
 import re
 import signal
 import sys
 import tarfile
+import threading
 import time
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
 
 import requests
 from dotenv import load_dotenv
 
+from rate_profiles import build_time_warp, parse_rate_profile
+
 load_dotenv()
 
 # Regex to match all OTLP nanosecond timestamp fields (quoted string values)
@@ -51,33 +67,207 @@ SIGNAL_ENDPOINT = {
 
 NGINX_BATCH_SIZE = 50
 
+# Lines per chunk handed to a load worker, and the smallest byte range a
+# plain-file input is split into
+LOAD_CHUNK_LINES = 2000
+LOAD_MIN_RANGE_BYTES = 1 << 20
 
-def load_batches(tar_path: str, signals: set[str]) -> list[tuple[str, int, str]]:
-    """Load batches from sample.tar.gz.
 
-    Returns raw (signal_type, ts_ns, payload) tuples without clamping.
+def _signal_from_name(name: str) -> str:
+    """Map an archive member or file name (e.g. 'traces.json') to a signal type."""
+    base = os.path.basename(name)
+    for suffix in (".ndjson", ".jsonl", ".json"):
+        if base.endswith(suffix):
+            return base[: -len(suffix)]
+    return base
+
+
+def _extract_chunk_timestamps(lines: list[str]) -> list[int | None]:
+    """Pool worker: extract the min timestamp of each line in a chunk."""
+    return [extract_min_timestamp(line) for line in lines]
+
+
+def _load_file_range(
+    path: str, signal_type: str, start: int, end: int,
+) -> list[tuple[str, int, str]]:
+    """Pool worker: read and parse the lines starting in [start, end) of a file.
+
+    Each worker opens the file itself, so reads and parsing both run in
+    parallel for pre-converted (uncompressed) inputs.
     """
     raw = []
-    with tarfile.open(tar_path, "r:gz") as tf:
-        for member in tf.getmembers():
+    with open(path, "rb") as f:
+        if start > 0:
+            # Skip the partial line; the previous range owns it
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            text = line.decode("utf-8").strip()
+            if not text:
+                continue
+            ts = extract_min_timestamp(text)
+            if ts is not None:
+                raw.append((signal_type, ts, text))
+    return raw
+
+
+def _split_file(path: str, parts: int) -> list[tuple[int, int]]:
+    """Split a file into roughly equal byte ranges (line-aligned by the reader)."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    step = max(LOAD_MIN_RANGE_BYTES, -(-size // parts))
+    return [(start, min(size, start + step)) for start in range(0, size, step)]
+
+
+def _input_files(input_path: str, signals: set[str]) -> list[tuple[str, str]]:
+    """List (path, signal_type) for a directory or single newline-delimited file."""
+    if os.path.isdir(input_path):
+        paths = [os.path.join(input_path, n) for n in sorted(os.listdir(input_path))]
+    else:
+        paths = [input_path]
+    files = []
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        signal_type = _signal_from_name(path)
+        if signal_type in signals:
+            files.append((path, signal_type))
+    return files
+
+
+@contextmanager
+def _open_tar(input_path: str) -> Iterator[tarfile.TarFile]:
+    """Open a .tar.gz or .tar.zst archive for sequential streaming reads."""
+    if input_path.endswith((".tar.zst", ".tzst")):
+        try:
+            import zstandard
+        except ImportError:
+            sys.exit(
+                f"{input_path}: reading .tar.zst requires the 'zstandard' package "
+                "(pip install zstandard)"
+            )
+        # TarFile.close() leaves an external fileobj open, so close the
+        # reader and the file here
+        with open(input_path, "rb") as fh, \
+                zstandard.ZstdDecompressor().stream_reader(fh) as reader, \
+                tarfile.open(fileobj=reader, mode="r|") as tf:
+            yield tf
+        return
+    with tarfile.open(input_path, "r|gz") as tf:
+        yield tf
+
+
+def _iter_tar_chunks(input_path: str, signals: set[str], chunk_lines: int):
+    """Yield (signal_type, lines) chunks from a compressed tar archive."""
+    with _open_tar(input_path) as tf:
+        for member in tf:
             if not member.isfile():
                 continue
-            signal_type = member.name.replace(".json", "")
+            signal_type = _signal_from_name(member.name)
             if signal_type not in signals:
                 continue
             f = tf.extractfile(member)
             if f is None:
                 continue
-            for line in io.TextIOWrapper(f, encoding="utf-8"):
-                line = line.strip()
+            chunk: list[str] = []
+            for line in f:
+                line = line.decode("utf-8").strip()
                 if not line:
                     continue
+                chunk.append(line)
+                if len(chunk) >= chunk_lines:
+                    yield signal_type, chunk
+                    chunk = []
+            if chunk:
+                yield signal_type, chunk
+
+
+def is_archive(input_path: str) -> bool:
+    """True if input_path is a compressed tar archive rather than plain files."""
+    return input_path.endswith((".tar.gz", ".tgz", ".tar.zst", ".tzst"))
+
+
+def load_batches(
+    input_path: str, signals: set[str], workers: int | None = None,
+) -> list[tuple[str, int, str]]:
+    """Load batches from sample.tar.gz or a pre-converted input.
+
+    input_path may be a .tar.gz / .tar.zst archive, a directory of
+    newline-delimited traces.json / logs.json / metrics.json files, or a
+    single such file. Timestamp extraction is spread across a process pool
+    of `workers` processes (default: all cores; 1 = serial, no pool).
+
+    Returns raw (signal_type, ts_ns, payload) tuples without clamping.
+    """
+    workers = workers or os.cpu_count() or 1
+    raw: list[tuple[str, int, str]] = []
+
+    if not is_archive(input_path):
+        tasks = [
+            (path, signal_type, start, end)
+            for path, signal_type in _input_files(input_path, signals)
+            for start, end in _split_file(path, workers)
+        ]
+        if workers == 1 or len(tasks) <= 1:
+            for task in tasks:
+                raw.extend(_load_file_range(*task))
+            return raw
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_load_file_range, *zip(*tasks)):
+                raw.extend(part)
+        return raw
+
+    chunks = _iter_tar_chunks(input_path, signals, LOAD_CHUNK_LINES)
+    if workers == 1:
+        for signal_type, lines in chunks:
+            for line in lines:
                 ts = extract_min_timestamp(line)
                 if ts is not None:
                     raw.append((signal_type, ts, line))
+        return raw
+
+    # Decompression stays in this process (gzip is a single stream) and
+    # overlaps with parsing: chunks are handed to the pool as they are read,
+    # keeping at most 2x workers chunks in flight.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+
+        def drain_one():
+            signal_type, lines, future = pending.popleft()
+            for line, ts in zip(lines, future.result()):
+                if ts is not None:
+                    raw.append((signal_type, ts, line))
+
+        for signal_type, lines in chunks:
+            pending.append(
+                (signal_type, lines, pool.submit(_extract_chunk_timestamps, lines))
+            )
+            if len(pending) >= 2 * workers:
+                drain_one()
+        while pending:
+            drain_one()
     return raw
 
 
+def benchmark_load(input_path: str, signals: set[str], counts: list[int] | None = None):
+    """Print load_batches() wall time for increasing worker counts."""
+    max_workers = os.cpu_count() or 1
+    counts = counts or sorted({1, max_workers, *(2 ** i for i in range(1, 8) if 2 ** i < max_workers)})
+    print(f"Load benchmark: {input_path} ({max_workers} cores available)")
+    print(f"  {'workers':>7}  {'seconds':>8}  {'batches':>8}  {'speedup':>7}")
+    baseline = None
+    for n in counts:
+        start = time.perf_counter()
+        raw = load_batches(input_path, signals, workers=n)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"  {n:>7}  {elapsed:>8.2f}  {len(raw):>8}  {baseline / elapsed:>6.2f}x")
+
+
 def clamp_and_sort_batches(
     raw: list[tuple[str, int, str]],
 ) -> list[tuple[str, int, int, str]]:
@@ -121,6 +311,28 @@ def rewrite_timestamps(payload: str, offset_ns: int) -> str:
     return TIMESTAMP_RE.sub(replace_ts, payload)
 
 
+def apply_payload_stages(
+    raw: list[tuple[str, int, str]], stages: list,
+) -> tuple[list[tuple[str, int, str]], dict[str, int]]:
+    """Run load-time stages (sampling, attribute processing) over every batch, parsing each payload once.
+
+    A stage has process(signal_type, data) -> bool: it edits the parsed OTLP
+    payload in place and returns False when nothing is left to send. Batches
+    are visited in timestamp order so stateful stages are deterministic.
+    """
+    out: list[tuple[str, int, str]] = []
+    stats = {"batches_in": len(raw), "batches_out": 0, "bytes_in": 0, "bytes_out": 0}
+    for signal_type, ts, payload in sorted(raw, key=lambda b: b[1]):
+        stats["bytes_in"] += len(payload)
+        data = json.loads(payload)
+        if all(stage.process(signal_type, data) for stage in stages):
+            payload = json.dumps(data, separators=(",", ":"))
+            stats["bytes_out"] += len(payload)
+            out.append((signal_type, ts, payload))
+    stats["batches_out"] = len(out)
+    return out, stats
+
+
 # ── NGINX helpers ──────────────────────────────────────────────────────────
 
 
@@ -199,9 +411,516 @@ def load_nginx_batches(log_path: str) -> list[tuple[str, int, str]]:
     return raw
 
 
+class NginxTailer:
+    """Incrementally read complete lines from a growing, rotating access log.
+
+    Tracks (inode, offset) of the last line handed out and persists it to a
+    JSON checkpoint, so a restart resumes where the previous run stopped.
+    Handles rename-style rotation (new inode: the old file is drained first)
+    and copytruncate (file shrinks below the offset: restart from 0).
+    """
+
+    def __init__(self, path: str, checkpoint_path: str | None = None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.inode: int | None = None
+        self.offset = 0
+        self.fh = None
+        self.rotations = 0
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("path") == os.path.abspath(path):
+                self.inode = saved.get("inode")
+                self.offset = saved.get("offset", 0)
+
+    def _open(self) -> bool:
+        try:
+            fh = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        inode = os.fstat(fh.fileno()).st_ino
+        if inode != self.inode:
+            # New file (first run, or rotated while we were not running)
+            self.inode, self.offset = inode, 0
+        fh.seek(self.offset)
+        self.fh = fh
+        return True
+
+    def read_lines(self, max_lines: int) -> list[tuple[bytes, int]]:
+        """Return up to max_lines new complete lines as (line, end_offset)."""
+        if self.fh is None and not self._open():
+            return []
+        lines = self._read(max_lines)
+        if lines:
+            return lines
+        # Nothing new: check whether the path now points at a different file
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if st.st_ino != self.inode:
+            self.fh.close()
+            self.fh = None
+            self.rotations += 1
+            self.inode = None
+            return self.read_lines(max_lines) if self._open() else []
+        if st.st_size < self.offset:
+            self.offset = 0
+            self.fh.seek(0)
+            self.rotations += 1
+        return []
+
+    def _read(self, max_lines: int) -> list[tuple[bytes, int]]:
+        lines = []
+        while len(lines) < max_lines:
+            line = self.fh.readline()
+            if not line.endswith(b"\n"):
+                # Partial line still being written; re-read it next time
+                self.fh.seek(self.offset)
+                break
+            self.offset += len(line)
+            lines.append((line, self.offset))
+        return lines
+
+    def checkpoint(self, inode: int | None, offset: int):
+        """Persist the position just after the last shipped line atomically."""
+        if not self.checkpoint_path:
+            return
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"path": os.path.abspath(self.path), "inode": inode, "offset": offset}, f,
+            )
+        os.replace(tmp, self.checkpoint_path)
+
+
+def follow_nginx(
+    log_path: str,
+    session: requests.Session,
+    otlp_endpoint: str,
+    should_stop,
+    checkpoint_path: str | None,
+    batch_size: int = NGINX_BATCH_SIZE,
+    window_s: float = 1.0,
+    report_interval: float = 10.0,
+    verbose: bool = False,
+    processor=None,
+):
+    """Tail log_path and ship new lines with live timestamps until should_stop().
+
+    Lines are batched until batch_size records or window_s seconds since the
+    first pending record, whichever comes first. The checkpoint only advances
+    after a batch is accepted, so a failed batch is retried rather than lost.
+    """
+    tailer = NginxTailer(log_path, checkpoint_path)
+    endpoint = f"{otlp_endpoint}/v1/{SIGNAL_ENDPOINT['nginx']}"
+    pending: list[dict] = []
+    # Position just after the last line read into `pending`
+    pending_pos = (tailer.inode, tailer.offset)
+    window_start = 0.0
+    sent_lines = sent_batches = sent_bytes = errors = parse_errors = 0
+    start = last_report = time.time()
+    backoff = 0.0
+
+    print(
+        f"Following {log_path} from offset {tailer.offset} "
+        f"(batch {batch_size} lines / {window_s:g}s window)"
+    )
+
+    def report(final: bool = False):
+        elapsed = max(time.time() - start, 1e-9)
+        prefix = "Follow summary:" if final else f"[{time.strftime('%H:%M:%S')}]"
+        print(
+            f"{prefix} {sent_lines} lines in {sent_batches} batches "
+            f"({sent_lines / elapsed:.1f} lines/s, {sent_bytes / elapsed / 1024:.1f} KiB/s) | "
+            f"offset {pending_pos[1]} | rotations {tailer.rotations}"
+            f"{f' | errors {errors}' if errors else ''}"
+            f"{f' | unparsable {parse_errors}' if parse_errors else ''}"
+        )
+
+    try:
+        while not should_stop():
+            # Only read as many lines as fit in the current batch, so memory
+            # stays bounded by batch_size however far behind we are
+            if len(pending) < batch_size:
+                for line, end_offset in tailer.read_lines(batch_size - len(pending)):
+                    text = line.strip()
+                    pending_pos = (tailer.inode, end_offset)
+                    if not text:
+                        continue
+                    try:
+                        data = json.loads(text)
+                    except json.JSONDecodeError:
+                        parse_errors += 1
+                        continue
+                    if not pending:
+                        window_start = time.time()
+                    record = nginx_line_to_log_record(data, time.time_ns())
+                    if processor:
+                        processor.process_log_record(record)
+                    pending.append(record)
+
+            now = time.time()
+            due = pending and (len(pending) >= batch_size or now - window_start >= window_s)
+            if due and now >= backoff:
+                payload = build_nginx_otlp_payload(pending)
+                try:
+                    r = session.post(endpoint, data=payload, timeout=5)
+                    ok = r.status_code < 400
+                    if not ok and verbose:
+                        print(f"  WARN: nginx HTTP {r.status_code}")
+                except requests.RequestException as e:
+                    ok = False
+                    if verbose:
+                        print(f"  WARN: nginx {e}")
+                if ok:
+                    sent_lines += len(pending)
+                    sent_batches += 1
+                    sent_bytes += len(payload)
+                    pending = []
+                    tailer.checkpoint(*pending_pos)
+                    backoff = 0.0
+                else:
+                    errors += 1
+                    backoff = now + 1.0
+            elif not pending:
+                time.sleep(0.05)
+            else:
+                time.sleep(min(0.05, max(0.0, window_start + window_s - now)))
+
+            if time.time() - last_report >= report_interval:
+                report()
+                last_report = time.time()
+    finally:
+        report(final=True)
+
+
+# ── Streaming loop ────────────────────────────────────────────────────────
+
+RESOURCE_LISTS = ("resourceSpans", "resourceLogs", "resourceMetrics")
+
+# Stand-in for the tenant ID; substituted per request with str.replace()
+TENANT_PLACEHOLDER = "__STREAM_TENANT_ID__"
+
+
+def inject_resource_attributes(payload: str, attrs: dict[str, str]) -> str:
+    """Add string attributes to every resource of a raw OTLP JSON payload.
+
+    Runs once per batch at load time. Entries without a `resource` get one;
+    existing attributes with the same keys are replaced.
+    """
+    data = json.loads(payload)
+    tags = [{"key": k, "value": {"stringValue": v}} for k, v in attrs.items()]
+    for list_key in RESOURCE_LISTS:
+        for entry in data.get(list_key, []):
+            resource = entry.setdefault("resource", {})
+            resource["attributes"] = [
+                a for a in resource.get("attributes", []) if a.get("key") not in attrs
+            ] + tags
+    return json.dumps(data, separators=(",", ":"))
+
+
+class StreamStats:
+    """Counters for one stream (one tenant); read by the reporting thread."""
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self.lock = threading.Lock()
+        self.cycles = 0
+        self.sent = 0
+        self.errors = 0
+        self.bytes = 0
+        self.cycle_start = time.time()
+        self.cycle_sent = 0
+        self.cycle_errors = 0
+        self.cycle_counts = {s: 0 for s in SIGNAL_TYPES}
+        self.latency_ms: deque = deque(maxlen=10_000)
+
+    def start_cycle(self, now: float):
+        with self.lock:
+            self.cycles += 1
+            self.cycle_start = now
+            self.cycle_sent = 0
+            self.cycle_errors = 0
+            self.cycle_counts = {s: 0 for s in SIGNAL_TYPES}
+
+    def record(self, signal_type: str, ok: bool, nbytes: int, latency_ms: float):
+        with self.lock:
+            self.sent += 1
+            self.cycle_sent += 1
+            self.cycle_counts[signal_type] = self.cycle_counts.get(signal_type, 0) + 1
+            self.bytes += nbytes
+            self.latency_ms.append(latency_ms)
+            if not ok:
+                self.errors += 1
+                self.cycle_errors += 1
+
+
+def load_tenant_keys(count: int, keys_file: str | None, default_key: str) -> list[str]:
+    """API keys for `count` tenants from a file (one per line) or HYPERDX_API_KEYS."""
+    if keys_file:
+        with open(keys_file, "r", encoding="utf-8") as f:
+            keys = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    else:
+        keys = [k.strip() for k in os.getenv("HYPERDX_API_KEYS", "").split(",") if k.strip()]
+    if not keys:
+        keys = [default_key]
+    if len(keys) < count:
+        print(
+            f"  WARN: {len(keys)} API key(s) for {count} tenants; reusing keys round-robin",
+            file=sys.stderr,
+        )
+    return [keys[i % len(keys)] for i in range(count)]
+
+
+def stream_cycles(
+    batches: list[tuple[str, int, int, str]],
+    send_offsets_ns: list[int],
+    session: requests.Session,
+    otlp_endpoint: str,
+    stop: threading.Event,
+    stats: StreamStats,
+    rate: float = 1.0,
+    substitutions: dict[str, str] | None = None,
+    cycle_placeholder: str | None = None,
+    ledger=None,
+    on_batch=None,
+    on_cycle_end=None,
+):
+    """Replay batches in cycles with live timestamps until stop is set.
+
+    send_offsets_ns gives each batch's send time relative to the cycle start.
+    substitutions are literal placeholder -> value replacements applied to
+    every payload before it is sent; cycle_placeholder, if given, is
+    replaced with the cycle number. ledger.record() counts each send for
+    --reconcile. on_batch(i, signal_type, error) runs after each send;
+    on_cycle_end(stats) after each completed cycle.
+    """
+    endpoints = {s: f"{otlp_endpoint}/v1/{SIGNAL_ENDPOINT[s]}" for s in SIGNAL_TYPES}
+
+    while not stop.is_set():
+        cycle_start = time.time()
+        cycle_start_ns = int(cycle_start * 1e9)
+        stats.start_cycle(cycle_start)
+        replacements = list((substitutions or {}).items())
+        if cycle_placeholder:
+            replacements.append((cycle_placeholder, str(stats.cycles)))
+
+        for i, (signal_type, sort_ts, orig_ts, payload) in enumerate(batches):
+            # Compute target send time within this cycle (using clamped sort_ts)
+            send_offset_ns = send_offsets_ns[i]
+            target_time = cycle_start + send_offset_ns / 1e9
+
+            # Apply rate multiplier to sleep; wake early on shutdown
+            sleep_time = (target_time - time.time()) / rate
+            if sleep_time > 0 and stop.wait(sleep_time):
+                break
+            if stop.is_set():
+                break
+
+            # Compress timestamps to fit within the cycle duration,
+            # and use clamped sort_ts as baseline to avoid outlier blowup
+            desired_ts_ns = cycle_start_ns + send_offset_ns
+            ts_offset_ns = desired_ts_ns - sort_ts
+
+            # Rewrite timestamps and send
+            rewritten = rewrite_timestamps(payload, ts_offset_ns)
+            for placeholder, value in replacements:
+                rewritten = rewritten.replace(placeholder, value)
+
+            error = None
+            post_start = time.perf_counter()
+            try:
+                r = session.post(endpoints[signal_type], data=rewritten, timeout=5)
+                if r.status_code >= 400:
+                    error = f"HTTP {r.status_code}"
+            except requests.RequestException as e:
+                error = str(e)
+            stats.record(
+                signal_type, error is None, len(rewritten),
+                (time.perf_counter() - post_start) * 1000,
+            )
+            if ledger:
+                ledger.record(stats.cycles, i, signal_type, error is None)
+            if on_batch:
+                on_batch(i, signal_type, error)
+
+        if on_cycle_end and not stop.is_set():
+            on_cycle_end(stats)
+
+
+def make_progress_printer(
+    stats: StreamStats,
+    n_batches: int,
+    selected: set[str],
+    verbose: bool,
+    report_interval: float,
+    extra=lambda: "",
+    shape=lambda elapsed: "",
+):
+    """on_batch callback printing the single-stream progress lines."""
+    state = {"cycle": 0, "last_report": 0.0}
+
+    def on_batch(i: int, signal_type: str, error: str | None):
+        if state["cycle"] != stats.cycles:
+            state["cycle"] = stats.cycles
+            state["last_report"] = stats.cycle_start
+        if error and verbose:
+            print(f"  WARN: {signal_type} {error}")
+
+        now = time.time()
+        if verbose:
+            print(f"  [{time.strftime('%H:%M:%S')}] {signal_type} batch {i + 1}/{n_batches}")
+        elif now - state["last_report"] >= report_interval:
+            elapsed = now - stats.cycle_start
+            rate = stats.cycle_sent / elapsed if elapsed > 0 else 0
+            parts = " ".join(
+                f"{s}: {stats.cycle_counts.get(s, 0)}" for s in SIGNAL_TYPES if s in selected
+            )
+            err_str = f" errors: {stats.cycle_errors}" if stats.cycle_errors else ""
+            print(
+                f"[{time.strftime('%H:%M:%S')}] {stats.cycle_sent} batches | "
+                f"{parts} | {rate:.1f}/s{err_str}{shape(elapsed)}{extra()}"
+            )
+            state["last_report"] = now
+    return on_batch
+
+
+def print_cycle_end(stats: StreamStats):
+    """on_cycle_end callback for the single-stream output."""
+    print(
+        f"\n--- Cycle {stats.cycles} complete "
+        f"({time.time() - stats.cycle_start:.1f}s, {stats.cycle_sent} batches"
+        f"{f', {stats.cycle_errors} errors' if stats.cycle_errors else ''}). "
+        f"Restarting ---\n"
+    )
+
+
+def _latency_percentiles(stats: StreamStats) -> tuple[float, float]:
+    with stats.lock:
+        lat = sorted(stats.latency_ms)
+    if not lat:
+        return 0.0, 0.0
+    return lat[len(lat) // 2], lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+
+
+def print_tenant_summary(all_stats: list[StreamStats], elapsed: float, probe=None):
+    """One-line multi-tenant progress report, naming the slowest tenant."""
+    sent = sum(st.sent for st in all_stats)
+    errors = sum(st.errors for st in all_stats)
+    p95 = {st.name: _latency_percentiles(st)[1] for st in all_stats}
+    slowest = max(p95, key=p95.get)
+    err_str = f" | errors: {errors}" if errors else ""
+    fresh_str = f" | {probe.summary()}" if probe else ""
+    print(
+        f"[{time.strftime('%H:%M:%S')}] {len(all_stats)} tenants | {sent} batches | "
+        f"{sent / elapsed if elapsed > 0 else 0:.1f}/s{err_str} | "
+        f"slowest {slowest} p95 {p95[slowest]:.0f}ms{fresh_str}"
+    )
+
+
+def print_tenant_table(all_stats: list[StreamStats], elapsed: float):
+    """Per-tenant throughput, error and POST latency breakdown."""
+    print(f"{'tenant':<14} {'batches':>8} {'errors':>7} {'batch/s':>8} {'KiB/s':>9} "
+          f"{'p50 ms':>7} {'p95 ms':>7}")
+    for st in all_stats:
+        p50, p95 = _latency_percentiles(st)
+        rate = st.sent / elapsed if elapsed > 0 else 0
+        kib_s = st.bytes / 1024 / elapsed if elapsed > 0 else 0
+        print(f"{st.name:<14} {st.sent:>8} {st.errors:>7} {rate:>8.1f} {kib_s:>9.1f} "
+              f"{p50:>7.1f} {p95:>7.1f}")
+
+
+def run_backfill_mode(args, batches, otlp_endpoint: str, api_key: str):
+    """--backfill: plan the window from the CLI options and send every copy."""
+    from backfill import BackfillPlan, run_backfill
+
+    if args.backfill_end:
+        try:
+            end = datetime.fromisoformat(args.backfill_end)
+        except ValueError:
+            sys.exit(f"--backfill-end: expected YYYY-MM-DD[THH:MM], got {args.backfill_end!r}")
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+    else:
+        end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    window_end_ns = int(end.timestamp()) * 10**9
+    window_ns = int(args.backfill * 86400 * 1e9)
+    data_start_ns = batches[0][1]
+    data_span_ns = max(1, batches[-1][1] - data_start_ns)
+    copies = args.copies or max(1, -(-window_ns // data_span_ns))
+
+    plan = BackfillPlan(
+        window_start_ns=window_end_ns - window_ns,
+        window_end_ns=window_end_ns,
+        data_start_ns=data_start_ns,
+        data_span_ns=data_span_ns,
+        copies=copies,
+        seed=args.seed,
+    )
+    print(
+        f"Window {datetime.fromtimestamp(plan.window_start_ns / 1e9, timezone.utc):%Y-%m-%d %H:%M} -> "
+        f"{end:%Y-%m-%d %H:%M} UTC, dataset span {data_span_ns / 3.6e12:.2f}h, seed {args.seed}"
+    )
+    start = time.time()
+    results = run_backfill(
+        batches, plan, otlp_endpoint, api_key,
+        workers=args.workers, batch_bytes=int(args.batch_mb * (1 << 20)),
+        report_interval=30.0 if args.quiet else 10.0,
+    )
+    elapsed = time.time() - start
+    sent = sum(r.bytes for r in results)
+    errors = sum(r.errors for r in results)
+    print(
+        f"\nBackfilled {len(results)}/{copies} copies in {elapsed:.0f}s: "
+        f"{sum(r.batches for r in results)} batches in {sum(r.requests for r in results)} requests, "
+        f"{sent / 1e6:.0f} MB ({sent / 1e6 / max(elapsed, 1e-9):.1f} MB/s), "
+        f"{sum(r.retries for r in results)} retries, {errors} errors"
+    )
+    for sample in {e for r in results for e in r.error_samples}:
+        print(f"  ERROR: {sample}", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
 # ── Preflight & main ──────────────────────────────────────────────────────
 
 
+def instrument_stages(profiler):
+    """--profile: time each pipeline stage by wrapping the functions it calls."""
+    module = sys.modules[__name__]
+    payload_len = lambda args, kwargs, result: len(args[0])
+    result_len = lambda args, kwargs, result: len(result)
+    profiler.instrument(module, "load_batches", "load (total)")
+    profiler.instrument(
+        module, "_iter_tar_chunks", "tar decompress",
+        size=lambda chunk: sum(len(line) for line in chunk[1]), generator=True,
+    )
+    profiler.instrument(
+        module, "_load_file_range", "read files",
+        size=lambda args, kwargs, result: sum(len(b[2]) for b in result),
+    )
+    profiler.instrument(module, "extract_min_timestamp", "extract_min_timestamp", size=payload_len)
+    profiler.instrument(module, "clamp_and_sort_batches", "clamp & sort")
+    profiler.instrument(
+        module, "apply_payload_stages", "payload stages",
+        size=lambda args, kwargs, result: result[1]["bytes_in"],
+    )
+    profiler.instrument(module, "build_nginx_otlp_payload", "json build", size=result_len)
+    profiler.instrument(module, "inject_resource_attributes", "inject attributes", size=result_len)
+    profiler.instrument(module, "rewrite_timestamps", "rewrite_timestamps", size=result_len)
+
+
+def profile_session(profiler, session: requests.Session) -> requests.Session:
+    """--profile: count this session's POSTs as the "http post" stage."""
+    if profiler:
+        session.post = profiler.wrap(
+            "http post", session.post, size=lambda args, kwargs, result: len(kwargs.get("data") or ""),
+        )
+    return session
+
+
 def preflight(
     otlp_endpoint: str,
     api_key: str,
@@ -255,7 +974,127 @@ def main():
     parser.add_argument("--nginx", action="store_true", help="Stream NGINX access logs")
     parser.add_argument("-v", "--verbose", action="store_true", help="Print every batch")
     parser.add_argument("-q", "--quiet", action="store_true", help="Summary every 30s only")
+    parser.add_argument(
+        "--input", default="sample.tar.gz",
+        help="Traces/logs/metrics source: .tar.gz, .tar.zst, a directory of "
+             "NDJSON files, or one NDJSON file (default: sample.tar.gz); an nginx.json "
+             "there is used instead of access.log",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Processes used to parse the input (default: all cores); a .tar.gz "
+             "or .tar.zst is still decompressed as one stream in this process",
+    )
+    parser.add_argument(
+        "--load-bench", nargs="?", const="", metavar="COUNTS",
+        help="Time input loading for increasing worker counts and exit; COUNTS "
+             "overrides them, e.g. 1,2,4,8 (default: 1, powers of 2, all cores)",
+    )
+    parser.add_argument(
+        "--synthetic", nargs="?", const="", metavar="SPEC",
+        help="Stream generated data instead of sample.tar.gz/access.log; SPEC is "
+             "key=value,... for otlp_generator.GeneratorConfig (e.g. services=50,tps=500)",
+    )
+    parser.add_argument(
+        "--freshness", type=float, nargs="?", const=5.0, metavar="SECONDS",
+        help="Inject marker span/log every SECONDS (default 5) and report how "
+             "long each takes to become queryable in ClickHouse",
+    )
+    parser.add_argument(
+        "--nginx-follow", metavar="PATH",
+        help="Tail a growing NGINX JSON access log and ship new lines with live "
+             "timestamps instead of replaying (resumes from --checkpoint)",
+    )
+    parser.add_argument(
+        "--follow-batch", type=int, default=NGINX_BATCH_SIZE,
+        help=f"--nginx-follow: max lines per request (default: {NGINX_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--follow-window", type=float, default=1.0,
+        help="--nginx-follow: max seconds a line waits for its batch to fill (default: 1)",
+    )
+    parser.add_argument(
+        "--checkpoint", default=".nginx-follow.checkpoint.json",
+        help="--nginx-follow: read-offset checkpoint file",
+    )
+    parser.add_argument(
+        "--rate-profile", default="flat", metavar="SPEC",
+        help="Shape the send rate over each cycle: flat, diurnal[:periods=1,floor=0.2], "
+             "step:1,2,4, burst[:x=5,every=60,width=10], replay:FILE (seconds,rps CSV)",
+    )
+    parser.add_argument(
+        "--tenants", type=int, default=1, metavar="N",
+        help="Stream N tenants in parallel, each with its own API key, connection "
+             "pool and a tenant.id resource attribute (keys from HYPERDX_API_KEYS)",
+    )
+    parser.add_argument(
+        "--tenant-keys", metavar="FILE",
+        help="--tenants: file with one API key per line (overrides HYPERDX_API_KEYS)",
+    )
+    parser.add_argument(
+        "--tenant-attr", default="tenant.id",
+        help="--tenants: resource attribute carrying the tenant ID (default: tenant.id)",
+    )
+    parser.add_argument(
+        "--sample", metavar="SPEC",
+        help="Thin the data once at load: traces=FRACTION (TraceId head sampling, keeps "
+             "correlated logs), logs=N / metrics=N (max records per service per second)",
+    )
+    parser.add_argument(
+        "--process", metavar="SPEC",
+        help="Slim payloads once at load: 'drop=GLOB,..;hash=GLOB,..;truncate=N;"
+             "max-value=N;numeric' (see payload_processors.py)",
+    )
+    parser.add_argument(
+        "--reconcile", type=float, nargs="?", const=30.0, metavar="SECONDS",
+        help="Tag payloads with run/cycle IDs, count records sent, and at exit compare "
+             "with rows stored in ClickHouse per cycle (waits up to SECONDS, default 30)",
+    )
+    parser.add_argument(
+        "--backfill", type=float, metavar="DAYS",
+        help="Write copies of the data across the past DAYS as fast as possible "
+             "(no pacing, merged requests, parallel workers) and exit",
+    )
+    parser.add_argument(
+        "--backfill-end", metavar="DATE",
+        help="--backfill: end of the window, YYYY-MM-DD[THH:MM][+HH:MM], UTC unless an offset "
+             "is given (default: today 00:00 UTC)",
+    )
+    parser.add_argument(
+        "--copies", type=int,
+        help="--backfill: copies of the dataset to spread over the window "
+             "(default: enough to cover it back to back)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="--backfill: seed for copy placement and IDs")
+    parser.add_argument(
+        "--batch-mb", type=float, default=4.0,
+        help="--backfill: merge batches into requests of about this size (default: 4)",
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const="stages", metavar="MODES",
+        help="Time each pipeline stage (calls, seconds, bytes, allocations) and print a "
+             "breakdown at exit; MODES adds alloc (tracemalloc) and/or cprofile",
+    )
+    parser.add_argument(
+        "--profile-out", default="stream_profile", metavar="PREFIX",
+        help="--profile: write PREFIX.json (and PREFIX.prof with cprofile)",
+    )
     args = parser.parse_args()
+    if args.tenants < 1:
+        sys.exit("--tenants must be >= 1")
+    if args.backfill is not None and (args.backfill <= 0 or args.tenants > 1):
+        sys.exit("--backfill needs a positive number of days and cannot be combined with --tenants")
+
+    profiler = None
+    if args.profile is not None:
+        from profiling import StageProfiler, parse_profile_modes
+
+        try:
+            profiler = StageProfiler(parse_profile_modes(args.profile), args.profile_out)
+        except ValueError as e:
+            sys.exit(f"--profile: {e}")
+        instrument_stages(profiler)
+        atexit.register(profiler.finish)
 
     # Determine which signals to stream
     selected = set()
@@ -270,14 +1109,90 @@ def main():
     if not selected:
         selected = set(SIGNAL_TYPES)
 
-    tar_path = "sample.tar.gz"
+    tar_path = args.input
     nginx_path = "access.log"
     otlp_endpoint = os.getenv("OTLP_ENDPOINT", "http://localhost:4318")
     api_key = os.getenv("HYPERDX_API_KEY", "")
 
+    gen_config = None
+    if args.synthetic is not None:
+        from otlp_generator import GeneratorConfig, generate_batches
+
+        try:
+            gen_config = GeneratorConfig.from_spec(args.synthetic)
+        except ValueError as e:
+            sys.exit(f"--synthetic: {e}")
+        if profiler:
+            generate_batches = profiler.wrap("synthetic generate", generate_batches)
+
     tar_signals = selected & {"traces", "logs", "metrics"}
-    need_tar = bool(tar_signals)
-    need_nginx = "nginx" in selected
+    # An NDJSON input with nginx.json (e.g. otlp_generator.py --out) replaces access.log
+    input_nginx = (
+        "nginx" in selected and gen_config is None and not is_archive(tar_path)
+        and os.path.exists(tar_path) and bool(_input_files(tar_path, {"nginx"}))
+    )
+    if input_nginx:
+        tar_signals.add("nginx")
+    need_tar = bool(tar_signals) and gen_config is None
+    need_nginx = "nginx" in selected and gen_config is None and not input_nginx
+
+    multi_tenant = args.tenants > 1
+    if multi_tenant:
+        try:
+            tenant_keys = load_tenant_keys(args.tenants, args.tenant_keys, api_key)
+        except OSError as e:
+            sys.exit(f"--tenant-keys: {e}")
+        api_key = api_key or tenant_keys[0]
+
+    stages = []
+    if args.sample:
+        from sampling import Sampler
+
+        try:
+            stages.append(Sampler.from_spec(args.sample))
+        except ValueError as e:
+            sys.exit(f"--sample: {e}")
+    processor = None
+    if args.process:
+        from payload_processors import AttributeProcessor
+
+        try:
+            processor = AttributeProcessor.from_spec(args.process)
+        except ValueError as e:
+            sys.exit(f"--process: {e}")
+        stages.append(processor)
+
+    if args.nginx_follow:
+        preflight(otlp_endpoint, api_key)
+        session = profile_session(profiler, requests.Session())
+        session.headers.update({
+            "Content-Type": "application/json",
+            "authorization": api_key,
+        })
+        stop_requested = []
+        signal.signal(signal.SIGINT, lambda signum, frame: stop_requested.append(signum))
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_requested.append(signum))
+        follow_nginx(
+            args.nginx_follow, session, otlp_endpoint,
+            should_stop=lambda: bool(stop_requested),
+            checkpoint_path=args.checkpoint,
+            batch_size=args.follow_batch,
+            window_s=args.follow_window,
+            report_interval=30.0 if args.quiet else 10.0,
+            verbose=args.verbose,
+            processor=processor,
+        )
+        return
+
+    if args.load_bench is not None:
+        if not os.path.exists(tar_path):
+            sys.exit(f"{tar_path} not found. Run ./setup.sh first.")
+        try:
+            counts = [int(n) for n in args.load_bench.split(",") if n.strip()]
+        except ValueError:
+            sys.exit(f"--load-bench: expected comma-separated worker counts, got {args.load_bench!r}")
+        benchmark_load(tar_path, tar_signals or {"traces", "logs", "metrics"}, counts)
+        return
 
     # Preflight checks
     preflight(
@@ -292,22 +1207,63 @@ def main():
 
     if need_tar:
         print(f"Loading batches from {tar_path}...")
-        raw.extend(load_batches(tar_path, tar_signals))
+        load_start = time.perf_counter()
+        raw.extend(load_batches(tar_path, tar_signals, workers=args.workers))
+        print(f"  Loaded {len(raw)} batches in {time.perf_counter() - load_start:.1f}s")
 
     if need_nginx:
         print(f"Loading NGINX batches from {nginx_path}...")
         raw.extend(load_nginx_batches(nginx_path))
 
+    if gen_config is not None:
+        print(f"Generating synthetic data ({args.synthetic or 'default options'})...")
+        gen_start = time.perf_counter()
+        raw.extend(generate_batches(gen_config, selected, workers=args.workers))
+        print(f"  Generated {len(raw)} batches in {time.perf_counter() - gen_start:.1f}s")
+
     if not raw:
         print("No batches found. Check sample.tar.gz / access.log.", file=sys.stderr)
         sys.exit(1)
 
+    if stages:
+        stage_start = time.perf_counter()
+        raw, stage_stats = apply_payload_stages(raw, stages)
+        print(
+            f"  Processed {stage_stats['batches_in']} batches in "
+            f"{time.perf_counter() - stage_start:.1f}s: {stage_stats['batches_out']} left, "
+            f"{stage_stats['bytes_in'] / 1e6:.1f} MB -> {stage_stats['bytes_out'] / 1e6:.1f} MB per cycle "
+            f"({(1 - stage_stats['bytes_out'] / max(1, stage_stats['bytes_in'])) * 100:.1f}% less)"
+        )
+        for stage in stages:
+            print(stage.report())
+
     # Clamp and sort combined batches
     batches = clamp_and_sort_batches(raw)
     if not batches:
         print("No valid batches after processing.", file=sys.stderr)
         sys.exit(1)
 
+    ledger = None
+    if args.reconcile is not None and not args.backfill:
+        from reconcile import DeliveryLedger
+
+        ledger = DeliveryLedger(batches)
+
+    # Tag once here; each tenant swaps in its ID (and every stream the cycle
+    # number) with a plain str.replace()
+    tag = {args.tenant_attr: TENANT_PLACEHOLDER} if multi_tenant else {}
+    if ledger:
+        tag.update(ledger.tags())
+    if tag:
+        batches = [
+            (sig, sort_ts, orig_ts, inject_resource_attributes(payload, tag))
+            for sig, sort_ts, orig_ts, payload in batches
+        ]
+
+    if args.backfill:
+        run_backfill_mode(args, batches, otlp_endpoint, api_key)
+        return
+
     # Compute original timeline
     original_start_ns = batches[0][1]
     original_end_ns = batches[-1][1]
@@ -319,136 +1275,130 @@ def main():
     cycle_s = args.cycle
     compression_ratio = cycle_s / original_duration_s
 
+    # Send offset of each batch within a cycle. Flat keeps the linear
+    # compression; other profiles warp the timeline so batch density
+    # follows the profile's rate curve.
+    try:
+        rate_fn = parse_rate_profile(args.rate_profile, cycle_s)
+    except (OSError, ValueError) as e:
+        sys.exit(f"--rate-profile: {e}")
+    if args.rate_profile == "flat":
+        send_offsets_ns = [
+            int((sort_ts - original_start_ns) * compression_ratio) for _, sort_ts, _, _ in batches
+        ]
+    else:
+        warp = build_time_warp(rate_fn, cycle_s)
+        send_offsets_ns = [
+            int(warp((sort_ts - original_start_ns) / original_duration_ns) * 1e9)
+            for _, sort_ts, _, _ in batches
+        ]
+
     # Count by signal type
     counts = {}
     for sig, _, _, _ in batches:
         counts[sig] = counts.get(sig, 0) + 1
     count_str = " + ".join(f"{counts.get(s, 0)} {s}" for s in SIGNAL_TYPES if s in counts)
 
+    tenant_str = f" x {args.tenants} tenants" if multi_tenant else ""
     print(
-        f"Streaming {len(batches)} batches ({count_str}) in {cycle_s:.0f}s cycles "
-        f"(original span: {original_duration_s / 3600:.1f}h, rate: {args.rate}x)"
+        f"Streaming {len(batches)} batches ({count_str}){tenant_str} in {cycle_s:.0f}s cycles "
+        f"(original span: {original_duration_s / 3600:.1f}h, rate: {args.rate}x"
+        f"{f', profile: {args.rate_profile}' if args.rate_profile != 'flat' else ''})"
     )
     print("Ctrl+C to stop\n")
 
-    # Setup HTTP session
-    session = requests.Session()
-    session.headers.update({
-        "Content-Type": "application/json",
-        "authorization": api_key,
-    })
-
     # Graceful shutdown
-    shutdown = False
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
 
-    def handle_signal(signum, frame):
-        nonlocal shutdown
-        shutdown = True
+    probe = None
+    if args.freshness:
+        from freshness import FreshnessProbe
 
-    signal.signal(signal.SIGINT, handle_signal)
-    signal.signal(signal.SIGTERM, handle_signal)
+        probe = FreshnessProbe(otlp_endpoint, api_key, args.freshness).start()
 
-    # Streaming loop
-    cycle_num = 0
-    total_sent = 0
-    total_errors = 0
+    report_interval = 30.0 if args.quiet else 10.0
     stream_start = time.time()
 
-    report_interval = 30.0 if args.quiet else 10.0
+    if multi_tenant:
+        streams = [
+            (f"tenant-{n + 1:0{len(str(args.tenants))}d}", key)
+            for n, key in enumerate(tenant_keys)
+        ]
+    else:
+        streams = [("default", api_key)]
+
+    all_stats: list[StreamStats] = []
+    threads: list[threading.Thread] = []
+    for tenant_id, key in streams:
+        # One session per tenant so each gets its own connection pool
+        session = profile_session(profiler, requests.Session())
+        session.headers.update({
+            "Content-Type": "application/json",
+            "authorization": key,
+        })
+        stats = StreamStats(tenant_id)
+        kwargs = {"rate": args.rate}
+        if ledger:
+            from reconcile import CYCLE_PLACEHOLDER
+
+            kwargs.update(ledger=ledger, cycle_placeholder=CYCLE_PLACEHOLDER)
+        if multi_tenant:
+            kwargs["substitutions"] = {TENANT_PLACEHOLDER: tenant_id}
+        else:
+            kwargs.update(
+                on_batch=make_progress_printer(
+                    stats, len(batches), selected, args.verbose, report_interval,
+                    lambda: f" | {probe.summary()}" if probe else "",
+                    (lambda t: f" | profile {rate_fn(t % cycle_s):.2f}x")
+                    if args.rate_profile != "flat" else (lambda t: ""),
+                ),
+                on_cycle_end=print_cycle_end,
+            )
+        thread = threading.Thread(
+            target=profiler.thread_target(stream_cycles) if profiler else stream_cycles,
+            args=(batches, send_offsets_ns, session, otlp_endpoint, stop, stats),
+            kwargs=kwargs,
+            name=f"stream-{tenant_id}",
+            daemon=True,
+        )
+        all_stats.append(stats)
+        threads.append(thread)
 
     try:
-        while not shutdown:
-            cycle_num += 1
-            cycle_start = time.time()
-            cycle_start_ns = int(cycle_start * 1e9)
-
-            cycle_sent = 0
-            cycle_errors = 0
-            cycle_counts = {s: 0 for s in SIGNAL_TYPES}
-            last_report = cycle_start
-
-            for i, (signal_type, sort_ts, orig_ts, payload) in enumerate(batches):
-                if shutdown:
-                    break
-
-                # Compute target send time within this cycle (using clamped sort_ts)
-                batch_offset_ns = sort_ts - original_start_ns
-                target_time = cycle_start + (batch_offset_ns / 1e9) * compression_ratio
-
-                # Apply rate multiplier to sleep
-                now = time.time()
-                sleep_time = (target_time - now) / args.rate
-                if sleep_time > 0:
-                    # Sleep in small increments to check shutdown flag
-                    end_sleep = now + sleep_time
-                    while time.time() < end_sleep and not shutdown:
-                        time.sleep(min(0.1, end_sleep - time.time()))
-
-                if shutdown:
-                    break
-
-                # Compress timestamps to fit within the cycle duration,
-                # and use clamped sort_ts as baseline to avoid outlier blowup
-                compressed_offset_ns = int(batch_offset_ns * compression_ratio)
-                desired_ts_ns = cycle_start_ns + compressed_offset_ns
-                ts_offset_ns = desired_ts_ns - sort_ts
-
-                # Rewrite timestamps and send
-                rewritten = rewrite_timestamps(payload, ts_offset_ns)
-                endpoint = f"{otlp_endpoint}/v1/{SIGNAL_ENDPOINT[signal_type]}"
-
-                try:
-                    r = session.post(endpoint, data=rewritten, timeout=5)
-                    if r.status_code >= 400:
-                        cycle_errors += 1
-                        if args.verbose:
-                            print(f"  WARN: {signal_type} HTTP {r.status_code}")
-                except requests.RequestException as e:
-                    cycle_errors += 1
-                    if args.verbose:
-                        print(f"  WARN: {signal_type} {e}")
-
-                cycle_sent += 1
-                cycle_counts[signal_type] = cycle_counts.get(signal_type, 0) + 1
-
-                # Periodic reporting
-                now = time.time()
-                if args.verbose:
-                    print(
-                        f"  [{time.strftime('%H:%M:%S')}] {signal_type} batch {i + 1}/{len(batches)}"
-                    )
-                elif now - last_report >= report_interval:
-                    elapsed = now - cycle_start
-                    rate = cycle_sent / elapsed if elapsed > 0 else 0
-                    parts = " ".join(
-                        f"{s}: {cycle_counts.get(s, 0)}" for s in SIGNAL_TYPES if s in selected
-                    )
-                    err_str = f" errors: {cycle_errors}" if cycle_errors else ""
-                    print(
-                        f"[{time.strftime('%H:%M:%S')}] {cycle_sent} batches | "
-                        f"{parts} | {rate:.1f}/s{err_str}"
-                    )
-                    last_report = now
-
-            # Cycle complete
-            total_sent += cycle_sent
-            total_errors += cycle_errors
-            cycle_elapsed = time.time() - cycle_start
-
-            if not shutdown:
-                print(
-                    f"\n--- Cycle {cycle_num} complete "
-                    f"({cycle_elapsed:.1f}s, {cycle_sent} batches"
-                    f"{f', {cycle_errors} errors' if cycle_errors else ''}). "
-                    f"Restarting ---\n"
-                )
-
+        for thread in threads:
+            thread.start()
+        last_report = time.time()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(0.2)
+            if multi_tenant and time.time() - last_report >= report_interval:
+                print_tenant_summary(all_stats, time.time() - stream_start, probe)
+                last_report = time.time()
     finally:
+        stop.set()
+        for t in threads:
+            t.join(6)
         elapsed = time.time() - stream_start
+        cycles = max(st.cycles for st in all_stats)
+        total_sent = sum(st.sent for st in all_stats)
+        total_errors = sum(st.errors for st in all_stats)
+        if multi_tenant:
+            print()
+            print_tenant_table(all_stats, elapsed)
         print(
-            f"\nStopped after {cycle_num} cycle(s), {elapsed:.0f}s total. "
+            f"\nStopped after {cycles} cycle(s), {elapsed:.0f}s total. "
             f"Sent {total_sent} batches ({total_errors} errors)."
         )
+        if probe:
+            probe.stop()
+            print(probe.report())
+        if ledger:
+            from clickhouse_http import ClickHouseHTTP
+
+            print(f"\nReconciling with ClickHouse (up to {args.reconcile:g}s)...")
+            print(ledger.reconcile(ClickHouseHTTP(timeout=30), stream_start, args.reconcile))
 
 
 if __name__ == "__main__":